@@ -91,6 +91,27 @@ export default function Dashboard() {
   };
 
   fetchDemands();
+
+  // Live updates: patch the list with the rows each upload inserts or updates
+  const stream = new EventSource("http://localhost:8000/demands/stream");
+
+  stream.addEventListener("demands", (e) => {
+    const { inserted = [], updated = [] } = JSON.parse(e.data);
+    const changed = new Map([...inserted, ...updated].map(d => [String(d.id), d]));
+    const added = new Set(inserted.map(d => String(d.id)));
+
+    setDemands(prev => [
+      ...inserted,
+      ...prev
+        .filter(d => !added.has(String(d.id)))
+        .map(d => changed.get(String(d.id)) || d),
+    ]);
+  });
+
+  // Change too large (or we fell behind): refetch everything
+  stream.addEventListener("resync", fetchDemands);
+
+  return () => stream.close();
 }, []);
 
 
@@ -1,17 +1,33 @@
 import os
 import json
-import google.generativeai as genai
 from typing import List
 from models import Employee
 from dotenv import load_dotenv
 from db import execute_read_query
+from request_log import record, stage
+from skills import SKILLS
+from startup import lazy_import
 
 load_dotenv()
 
 # Configure Gemini API
 API_KEY = os.getenv("GEMINI_API_KEY")
-if API_KEY:
-    genai.configure(api_key=API_KEY)
+_genai = None
+
+
+def get_genai():
+    """
+    Import and configure the Gemini SDK on first use, so importing this module
+    stays cheap.
+    """
+    global _genai
+    if _genai is None:
+        genai = lazy_import("google.generativeai")
+        if API_KEY:
+            genai.configure(api_key=API_KEY)
+        _genai = genai
+    return _genai
+
 
 def get_ai_agent_recommendation(task_description: str, employees: List[Employee]) -> List[Employee]:
     """
@@ -27,7 +43,9 @@ def get_ai_agent_recommendation(task_description: str, employees: List[Employee]
     
     if not API_KEY:
         # Fallback to basic keyword matching if API key not configured
-        return basic_keyword_matching(task_description, employees)
+        record(fallback="keyword")
+        with stage("keyword"):
+            return basic_keyword_matching(task_description, employees)
     
     try:
         # Prepare employee data for the AI model
@@ -71,8 +89,10 @@ def get_ai_agent_recommendation(task_description: str, employees: List[Employee]
         """
         
         # Call Gemini API
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
+        model = get_genai().GenerativeModel('gemini-2.0-flash')
+        record(model='gemini-2.0-flash')
+        with stage("model"):
+            response = model.generate_content(prompt)
         
         # Parse the response
         response_text = response.text.strip()
@@ -99,23 +119,33 @@ def get_ai_agent_recommendation(task_description: str, employees: List[Employee]
     except Exception as e:
         print(f"Error calling Gemini API: {e}")
         # Fallback to basic matching
-        return basic_keyword_matching(task_description, employees)
+        record(fallback="keyword", error=str(e))
+        with stage("keyword"):
+            return basic_keyword_matching(task_description, employees)
 
 
 def basic_keyword_matching(task_description: str, employees: List[Employee]) -> List[Employee]:
     """
     Fallback basic keyword matching when AI is not available.
-    Matches employees based on skill keywords in the task description.
+    Matches employees based on skill keywords in the task description
+    (aliases and misspellings resolved with the skill taxonomy).
     """
     task_lower = task_description.lower()
     scored_employees = []
-    
+
+    # Spellings (as stored on employees) of the skills the task mentions,
+    # resolved once per distinct skill (see skills.py)
+    distinct = {skill for emp in employees for skill in emp.skills}
+    SKILLS.update(distinct)
+    mentioned = SKILLS.mentioned(task_description)
+    wanted = {skill for skill in distinct if SKILLS.canonical(skill) in mentioned}
+
     for emp in employees:
         score = 0
         
         # Score based on skill matches
         for skill in emp.skills:
-            if skill.lower() in task_lower:
+            if skill in wanted:
                 score += 2
         
         # Score based on qualifications
@@ -147,11 +177,12 @@ def basic_keyword_matching(task_description: str, employees: List[Employee]) ->
 import re
 import os
 
-def generate_sql_from_task(task_description: str, table_name: str = 'demands') -> str | None:
+def generate_sql_from_task(task_description: str, table_name: str = 'demands', roles: List[str] | None = None) -> str | None:
     """
     Generates safe SQL. 
     Fixes 'tuple index out of range' by escaping % to %%.
     Fixes 400 Bad Request by removing trailing semicolons.
+    `roles` (e.g. from the demands snapshot) skips the DISTINCT role query.
     """
     # 1. CONFIGURATION
     # if not API_KEY: return None 
@@ -164,12 +195,16 @@ def generate_sql_from_task(task_description: str, table_name: str = 'demands') -
     ]
 
     # 2. FETCH EXISTING ROLES (Context)
-    try:
-        rows = execute_read_query(f"SELECT DISTINCT role FROM {table_name} WHERE role IS NOT NULL;")
-        roles_list = [str(r.get('role')).strip() for r in rows if r.get('role')]
-    except Exception:
-        # Fallback roles for testing/safety
-        roles_list = ["Sr. Frontend Developer", "Backend Engineer", "DevOps Specialist", "React Developer"]
+    if roles:
+        roles_list = [str(r).strip() for r in roles if r]
+    else:
+        try:
+            with stage("roles"):
+                rows = execute_read_query(f"SELECT DISTINCT role FROM {table_name} WHERE role IS NOT NULL;")
+            roles_list = [str(r.get('role')).strip() for r in rows if r.get('role')]
+        except Exception:
+            # Fallback roles for testing/safety
+            roles_list = ["Sr. Frontend Developer", "Backend Engineer", "DevOps Specialist", "React Developer"]
 
     roles_context = "\n".join([f"- {r}" for r in roles_list])
 
@@ -195,8 +230,10 @@ You are a PostgreSQL expert. Convert the user's requirement into ONE SAFE SELECT
 """
 
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
+        model = get_genai().GenerativeModel('gemini-2.0-flash')
+        record(model='gemini-2.0-flash')
+        with stage("model"):
+            response = model.generate_content(prompt)
         raw = response.text.strip()
 
         # 4. CLEANUP RESPONSE
@@ -255,8 +292,8 @@ You are a PostgreSQL expert. Convert the user's requirement into ONE SAFE SELECT
         # This prevents "tuple index out of range" errors in Python DB drivers
         final_sql = sql.replace("%", "%%")
 
-        print(f"\nDEBUG FINAL SQL (SENT TO DB):\n{final_sql}\n")
-        
+        record(sql=final_sql)
+
         return final_sql
 
     except Exception as e:
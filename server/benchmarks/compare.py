@@ -0,0 +1,48 @@
+"""
+Compare two load benchmark result files.
+
+    python -m benchmarks.compare results/old.json results/new.json
+
+Prints throughput and latency deltas per route and for upload ingest.
+"""
+import json
+import sys
+
+
+def _pct(old, new):
+    if old in (None, 0) or new is None:
+        return "    n/a"
+    return f"{(new - old) / old * 100:+7.1f}%"
+
+
+def compare(old: dict, new: dict):
+    lines = []
+    for key in ("employees", "demands", "concurrency", "gemini_latency_ms"):
+        if old["meta"].get(key) != new["meta"].get(key):
+            lines.append(f"note: {key} differs ({old['meta'].get(key)} -> {new['meta'].get(key)})")
+
+    lines.append(f"{'route':<26} {'rps':>16} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name in sorted(set(old["routes"]) | set(new["routes"])):
+        a, b = old["routes"].get(name), new["routes"].get(name)
+        if not a or not b:
+            lines.append(f"{name:<26} only in {'new' if b else 'old'}")
+            continue
+        lines.append(
+            f"{name:<26} {b['throughput_rps']:>8.1f} {_pct(a['throughput_rps'], b['throughput_rps'])}"
+            f" {_pct(a['p50_ms'], b['p50_ms'])} {_pct(a['p95_ms'], b['p95_ms'])} {_pct(a['p99_ms'], b['p99_ms'])}"
+        )
+
+    for name in sorted(set(old.get("upload", {})) & set(new.get("upload", {}))):
+        a, b = old["upload"][name], new["upload"][name]
+        lines.append(f"upload {name:<19} {b['rows_per_sec']} rows/s {_pct(a['rows_per_sec'], b['rows_per_sec'])}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m benchmarks.compare OLD.json NEW.json")
+    with open(sys.argv[1]) as f:
+        old = json.load(f)
+    with open(sys.argv[2]) as f:
+        new = json.load(f)
+    print(compare(old, new))
@@ -0,0 +1,82 @@
+"""
+Stand-in for `google.generativeai` with simulated latency.
+
+`install()` swaps `GenerativeModel` for `FakeGenerativeModel` so `ai_agent`
+never leaves the process. Responses are shaped like the real ones the code
+parses: a JSON blob of employee ids for the recommendation prompt and a single
+SELECT for the text-to-SQL prompt.
+"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+import types
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Mimics `genai.GenerativeModel(...).generate_content(prompt)`."""
+
+    latency_ms = 400.0
+    jitter_ms = 150.0
+    calls = 0
+    _lock = threading.Lock()
+    _rng = random.Random(1234)
+
+    def __init__(self, model_name: str = "gemini-2.0-flash", **kwargs):
+        self.model_name = model_name
+
+    @classmethod
+    def _sleep(cls):
+        with cls._lock:
+            cls.calls += 1
+            delay = max(0.0, cls._rng.gauss(cls.latency_ms, cls.jitter_ms))
+        time.sleep(delay / 1000.0)
+
+    def generate_content(self, prompt: str, **kwargs) -> FakeResponse:
+        self._sleep()
+
+        if "PostgreSQL expert" in prompt:
+            table = re.search(r"Table:\s*(\w+)", prompt)
+            table = table.group(1) if table else "demands"
+            if table == "employees":
+                sql = "SELECT * FROM employees WHERE team ILIKE '%Backend%' LIMIT 50"
+            else:
+                sql = f"SELECT * FROM {table} WHERE role ILIKE '%Engineer%' LIMIT 50"
+            return FakeResponse(f"```sql\n{sql}\n```")
+
+        # Recommendation prompt: pick a handful of the ids that were sent
+        ids = [int(i) for i in re.findall(r'"id":\s*(\d+)', prompt)[:200]]
+        picked = ids[::7][:10]
+        return FakeResponse(json.dumps({
+            "task_analysis": "synthetic",
+            "suitable_employee_ids": picked,
+            "reasoning": "synthetic",
+        }))
+
+
+def install(latency_ms: float = 400.0, jitter_ms: float = 150.0):
+    """Route every Gemini call in this process to `FakeGenerativeModel`."""
+    FakeGenerativeModel.latency_ms = latency_ms
+    FakeGenerativeModel.jitter_ms = jitter_ms
+    FakeGenerativeModel.calls = 0
+
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        # Benchmarks must not depend on the real SDK being installed
+        genai = types.ModuleType("google.generativeai")
+        genai.configure = lambda **kwargs: None
+        google = sys.modules.setdefault("google", types.ModuleType("google"))
+        google.generativeai = genai
+        sys.modules["google.generativeai"] = genai
+
+    genai.GenerativeModel = FakeGenerativeModel
+    genai.configure = lambda **kwargs: None
+    return genai
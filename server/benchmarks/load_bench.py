@@ -0,0 +1,451 @@
+"""
+End-to-end load and latency benchmark for the API.
+
+Starts the FastAPI app under uvicorn in-process, against a fresh local Postgres
+seeded with synthetic demands and employees, with Gemini replaced by a fake
+that only sleeps. Every route in `main.py` is driven by a closed loop of
+concurrent clients; throughput and p50/p95/p99 latency are reported per route,
+plus the ingest rate of `/upload-excel`. Results are written as JSON so runs
+can be compared with `python -m benchmarks.compare`.
+
+Run from the `server/` directory:
+
+    python -m benchmarks.load_bench --employees 10000 --demands 50000
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from benchmarks import fake_gemini, synthetic  # noqa: E402
+from benchmarks.postgres import local_postgres  # noqa: E402
+
+# Each route in main.py maps to one request scenario. `params` may be a callable
+# taking the request number, so lookups spread over the seeded ids.
+SCENARIOS = [
+    {"name": "health", "method": "GET", "route": "/", "path": "/"},
+    {"name": "startup_report", "method": "GET", "route": "/startup-report", "path": "/startup-report"},
+    {"name": "list_employees", "method": "GET", "route": "/employees", "path": "/employees"},
+    {"name": "employee_snapshot", "method": "GET", "route": "/employees/snapshot", "path": "/employees/snapshot"},
+    {
+        "name": "refresh_employee_snapshot", "method": "POST", "route": "/employees/snapshot/refresh",
+        "path": "/employees/snapshot/refresh",
+    },
+    {
+        "name": "search_employees", "method": "GET", "route": "/employees/search",
+        "path": "/employees/search", "params": {"skill": "react", "availability": "Available"},
+    },
+    {
+        "name": "employee_changes", "method": "GET", "route": "/employees/changes",
+        "path": lambda i, ctx: f"/employees/changes?since={ctx['employees_watermark']}",
+    },
+    {
+        "name": "get_employee", "method": "GET", "route": "/employees/{employee_id}",
+        "path": lambda i, ctx: f"/employees/{(i * 7919) % ctx['employees'] + 1}",
+    },
+    {
+        "name": "filter_employees", "method": "GET", "route": "/employees/filter",
+        "path": "/employees/filter", "params": {"skill": "react", "availability": "Available"},
+    },
+    {
+        "name": "ai_search", "method": "POST", "route": "/employees/ai-search",
+        "path": "/employees/ai-search",
+        "params": {"task_description": "Build a React frontend with TypeScript"},
+    },
+    {
+        "name": "employees_ai_sql_search", "method": "POST", "route": "/employees/ai-sql-search",
+        "path": "/employees/ai-sql-search",
+        "params": {"task_description": "Backend developers who know Python"},
+    },
+    {
+        "name": "demands_ai_sql_search", "method": "POST", "route": "/demands/ai-sql-search",
+        "path": "/demands/ai-sql-search",
+        "params": {"task_description": "Open application engineer demands"},
+    },
+    {"name": "tables", "method": "GET", "route": "/tables", "path": "/tables"},
+    {"name": "demands_analytics", "method": "GET", "route": "/demands/analytics", "path": "/demands/analytics"},
+    {"name": "analytics_demands", "method": "GET", "route": "/analytics/demands", "path": "/analytics/demands"},
+    {"name": "list_demands", "method": "GET", "route": "/demands", "path": "/demands"},
+    {"name": "demand_snapshot", "method": "GET", "route": "/demands/snapshot", "path": "/demands/snapshot"},
+    {
+        "name": "refresh_demand_snapshot", "method": "POST", "route": "/demands/snapshot/refresh",
+        "path": "/demands/snapshot/refresh",
+    },
+    {
+        "name": "demand_stream_status", "method": "GET", "route": "/demands/stream/status",
+        "path": "/demands/stream/status",
+    },
+    {
+        "name": "search_demands", "method": "GET", "route": "/demands/search",
+        "path": "/demands/search", "params": {"status": "Open", "location": "Offshore"},
+    },
+    {
+        "name": "demand_changes", "method": "GET", "route": "/demands/changes",
+        "path": lambda i, ctx: f"/demands/changes?since={quote(ctx['demands_watermark'])}",
+    },
+    # Long-lived Server-Sent Events stream, not a request/response route
+    {"name": "demand_stream", "method": "GET", "route": "/demands/stream", "path": None},
+    # Measured separately as ingest rate, see run_upload() / run_batch_upload()
+    {"name": "upload_excel", "method": "POST", "route": "/upload-excel", "path": None},
+    {"name": "upload_batch", "method": "POST", "route": "/upload-batch", "path": None},
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, errors, statuses, wall):
+    latencies = sorted(latencies)
+    ms = lambda v: round(v * 1000.0, 3) if v is not None else None
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "status_codes": statuses,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, port):
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def seed_employees(connect, count):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            skills TEXT,
+            qualifications TEXT,
+            strength INTEGER,
+            availability TEXT,
+            team TEXT
+        );
+    """)
+    cur.copy_expert(
+        "COPY employees (id, name, skills, qualifications, strength, availability, team) FROM STDIN",
+        synthetic.employees_copy_buffer(count),
+    )
+    conn.commit()
+    cur.close()
+    conn.close()
+
+
+def seed_demands(client, connect, count):
+    """
+    Let the app create `demands` from a sample upload (so the schema is the one
+    production would get), then bulk COPY the remaining rows, converted by the
+    same typed ingest stage so dates arrive as ISO values.
+    """
+    import pandas as pd
+    from ingest import infer_types, normalize_upload_frame
+
+    sample = min(count, 500)
+    res = client.post(
+        "/upload-excel",
+        files={"file": ("demands.csv", synthetic.demands_csv(sample), "text/csv")},
+        data={"tableName": "demands"},
+    )
+    res.raise_for_status()
+
+    remaining = count - sample
+    if remaining <= 0:
+        return
+    columns = ", ".join(f'"{c.lower()}"' for c in synthetic.DEMAND_COLUMNS)
+    conn = connect()
+    cur = conn.cursor()
+    chunk = 100_000
+    for start in range(sample + 1, count + 1, chunk):
+        size = min(chunk, count + 1 - start)
+        frame = normalize_upload_frame(pd.read_csv(io.BytesIO(synthetic.demands_csv(size, start=start))))
+        typed, _ = infer_types(frame)
+        buf = io.StringIO()
+        typed.to_csv(buf, header=False, index=False)
+        buf.seek(0)
+        cur.copy_expert(f"COPY demands ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    # Rows loaded behind the app's back: republish the demands snapshot now
+    client.post("/demands/snapshot/refresh").raise_for_status()
+
+
+def run_scenario(base_url, scenario, ctx, concurrency, duration, max_requests):
+    import httpx
+
+    latencies = []
+    statuses = {}
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(max_requests))
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        nonlocal errors
+        local_lat = []
+        local_status = {}
+        local_err = 0
+        with httpx.Client(base_url=base_url, timeout=120.0) as client:
+            while time.perf_counter() < stop_at:
+                try:
+                    i = next(counter)
+                except StopIteration:
+                    break
+                path = scenario["path"]
+                if callable(path):
+                    path = path(i, ctx)
+                t0 = time.perf_counter()
+                try:
+                    res = client.request(scenario["method"], path, params=scenario.get("params"))
+                    elapsed = time.perf_counter() - t0
+                    local_status[str(res.status_code)] = local_status.get(str(res.status_code), 0) + 1
+                    if res.status_code < 400:
+                        local_lat.append(elapsed)
+                    else:
+                        local_err += 1
+                except httpx.HTTPError:
+                    local_err += 1
+        with lock:
+            latencies.extend(local_lat)
+            errors += local_err
+            for k, v in local_status.items():
+                statuses[k] = statuses.get(k, 0) + v
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - t0
+    return summarize(latencies, errors, statuses, wall)
+
+
+def run_upload(client, table, rows, start):
+    payload = synthetic.demands_csv(rows, start=start)
+    t0 = time.perf_counter()
+    res = client.post(
+        "/upload-excel",
+        files={"file": ("demands.csv", payload, "text/csv")},
+        data={"tableName": table},
+        timeout=None,
+    )
+    elapsed = time.perf_counter() - t0
+    body = res.json() if res.headers.get("content-type", "").startswith("application/json") else {}
+    return {
+        "table": table,
+        "rows": rows,
+        "status_code": res.status_code,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 2) if elapsed > 0 else None,
+        "bytes_per_sec": round(len(payload) / elapsed, 2) if elapsed > 0 else None,
+        "debug": body.get("debug") if isinstance(body, dict) else None,
+    }
+
+
+def run_batch_upload(client, rows, sheets=4):
+    """One workbook with `sheets` sheets of `rows` demands each, every sheet into its own new table."""
+    import pandas as pd
+
+    book = io.BytesIO()
+    with pd.ExcelWriter(book, engine="openpyxl") as writer:
+        for n in range(sheets):
+            frame = pd.read_csv(io.BytesIO(synthetic.demands_csv(rows, start=n * rows + 1)))
+            frame.to_excel(writer, sheet_name=f"batch bench {n}", index=False)
+    payload = book.getvalue()
+
+    t0 = time.perf_counter()
+    res = client.post("/upload-batch", files=[("files", ("plan.xlsx", payload))], timeout=None)
+    elapsed = time.perf_counter() - t0
+    body = res.json() if res.headers.get("content-type", "").startswith("application/json") else {}
+    total = rows * sheets
+    return {
+        "sheets": sheets,
+        "rows": total,
+        "status_code": res.status_code,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(total / elapsed, 2) if elapsed > 0 else None,
+        "bytes_per_sec": round(len(payload) / elapsed, 2) if elapsed > 0 else None,
+        "parts": body.get("parts") if isinstance(body, dict) else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--employees", type=int, default=1000, help="synthetic employees (1k..1M)")
+    p.add_argument("--demands", type=int, default=1000, help="synthetic demand rows (1k..1M)")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--duration", type=float, default=5.0, help="seconds per route")
+    p.add_argument("--max-requests", type=int, default=100_000, help="cap per route")
+    p.add_argument("--gemini-latency-ms", type=float, default=400.0)
+    p.add_argument("--gemini-jitter-ms", type=float, default=150.0)
+    p.add_argument("--upload-rows", type=int, default=2000)
+    p.add_argument("--pg", choices=["embedded", "env"], default="embedded")
+    p.add_argument("--only", nargs="*", help="scenario names to run (default: all)")
+    p.add_argument("--out", default=os.path.join(SERVER_DIR, "benchmarks", "results"))
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fake_gemini.install(args.gemini_latency_ms, args.gemini_jitter_ms)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    # Private employee snapshot directory for this run
+    snapshot_dir = tempfile.mkdtemp(prefix="demand-bench-snapshots-")
+    os.environ["SNAPSHOT_DIR"] = snapshot_dir
+
+    with local_postgres(args.pg) as connect:
+        # Import the app only now: db.py reads the PG* variables at import time
+        import ai_agent
+        import main as app_module
+        import request_log
+
+        ai_agent.API_KEY = "benchmark"
+        # The AI requests of the run, replayable with `python -m benchmarks.replay`
+        os.makedirs(args.out, exist_ok=True)
+        ai_log = os.path.join(args.out, f"ai-requests-{stamp}.jsonl")
+        request_log.AI_REQUEST_LOG = ai_log
+
+        t0 = time.perf_counter()
+        seed_employees(connect, args.employees)
+        print(f"seeded {args.employees} employees in {time.perf_counter() - t0:.1f}s")
+
+        import httpx
+
+        port = free_port()
+        server, thread = start_server(app_module.app, port)
+        base_url = f"http://127.0.0.1:{port}"
+        ctx = {"employees": args.employees, "demands": args.demands}
+
+        try:
+            with httpx.Client(base_url=base_url, timeout=None) as client:
+                t0 = time.perf_counter()
+                seed_demands(client, connect, args.demands)
+                print(f"seeded {args.demands} demands in {time.perf_counter() - t0:.1f}s")
+
+                # Delta-sync scenarios poll from the current watermark (nothing changed)
+                for table in ("demands", "employees"):
+                    ctx[f"{table}_watermark"] = client.get(f"/{table}/changes").json()["watermark"]
+
+                app_routes = {
+                    (method, route.path)
+                    for route in app_module.app.routes
+                    if hasattr(route, "methods") and route.path not in ("/openapi.json", "/docs", "/redoc", "/docs/oauth2-redirect")
+                    for method in route.methods
+                    if method != "HEAD"
+                }
+                covered = {(s["method"], s["route"]) for s in SCENARIOS}
+                for method, path in sorted(app_routes - covered):
+                    print(f"WARNING: no benchmark scenario for {method} {path}")
+
+                results = {}
+                for scenario in SCENARIOS:
+                    if scenario["path"] is None or (args.only and scenario["name"] not in args.only):
+                        continue
+                    results[scenario["name"]] = {
+                        "method": scenario["method"],
+                        "route": scenario["route"],
+                        **run_scenario(base_url, scenario, ctx, args.concurrency, args.duration, args.max_requests),
+                    }
+                    r = results[scenario["name"]]
+                    print(
+                        f"{scenario['name']:<26} {r['throughput_rps']:>9.1f} rps  "
+                        f"p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  errors {r['errors']}"
+                    )
+
+                upload = {}
+                if not args.only or "upload_excel" in args.only:
+                    upload["new_table"] = run_upload(client, "demands_ingest_bench", args.upload_rows, 1)
+                    upload["upsert_existing"] = run_upload(
+                        client, "demands", args.upload_rows, args.demands - args.upload_rows // 2 + 1
+                    )
+                if not args.only or "upload_batch" in args.only:
+                    upload["batch_workbook"] = run_batch_upload(client, args.upload_rows)
+                for k, v in upload.items():
+                    print(f"upload {k:<20} {v['rows_per_sec']} rows/s ({v['rows']} rows, {v['seconds']}s)")
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "postgres": args.pg,
+            "employees": args.employees,
+            "demands": args.demands,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "gemini_latency_ms": args.gemini_latency_ms,
+            "gemini_jitter_ms": args.gemini_jitter_ms,
+            "gemini_calls": fake_gemini.FakeGenerativeModel.calls,
+            "ai_request_log": ai_log,
+        },
+        "routes": results,
+        "upload": upload,
+    }
+
+    path = os.path.join(args.out, f"load-{stamp}-e{args.employees}-d{args.demands}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from db import decode_rows
+
+
+def bench_compute_demand_analytics(benchmark, tmp_path, demand_db_rows):
+    """Analytics behind `/analytics/demands`, read from a published demands snapshot."""
+    from demand_snapshot import DemandSnapshotStore
+    from main import compute_demand_analytics
+
+    store = DemandSnapshotStore(str(tmp_path))
+    store.publish(decode_rows(demand_db_rows), fingerprint="bench", source="bench")
+    snap = store.snapshot()
+    benchmark(compute_demand_analytics, snap)
+
+
+def bench_write_demand_snapshot(benchmark, tmp_path, demand_db_rows):
+    """Columnar snapshot build done at the end of an upload into `demands`."""
+    from demand_snapshot import write_demand_snapshot
+
+    rows = decode_rows(demand_db_rows)
+    counter = iter(range(10 ** 6))
+    benchmark.pedantic(
+        lambda: write_demand_snapshot(str(tmp_path / f"s{next(counter)}"), rows),
+        rounds=5,
+    )
+
+
+def bench_decode_rows(benchmark, demand_db_rows):
+    """Per-value JSON decoding done by `execute_read_query`."""
+    benchmark(decode_rows, demand_db_rows)
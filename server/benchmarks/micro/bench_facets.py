@@ -0,0 +1,37 @@
+import pytest
+
+DEMAND_FACETS = ["role", "location", "status"]
+
+
+@pytest.fixture(scope="module")
+def demand_index(demand_db_rows):
+    from facets import FacetIndex
+
+    index = FacetIndex(DEMAND_FACETS, descending=True)
+    index.load([(row["id"], row) for row in demand_db_rows])
+    return index
+
+
+def bench_facet_index_load(benchmark, demand_db_rows):
+    """Bitmap build from a full sync (first `/demands/search` of a worker)."""
+    from facets import FacetIndex
+
+    items = [(row["id"], row) for row in demand_db_rows]
+    benchmark.pedantic(lambda: FacetIndex(DEMAND_FACETS, descending=True).load(items), rounds=5)
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"status": ["Open"]},
+    {"status": ["Allocated", "Mapped"], "location": ["Offshore"]},
+], ids=["none", "status", "status+location"])
+def bench_facet_search(benchmark, demand_index, filters):
+    """Page plus facet counts behind `/demands/search`."""
+    benchmark(demand_index.search, filters, offset=100, limit=20)
+
+
+def bench_facet_upsert(benchmark, demand_index, demand_db_rows):
+    """Incremental update of one changed demand (delta sync)."""
+    row = dict(demand_db_rows[0])
+    statuses = iter(["Open", "Allocated"] * 10 ** 6)
+    benchmark(lambda: demand_index.upsert(row["id"], dict(row, status=next(statuses))))
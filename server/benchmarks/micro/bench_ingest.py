@@ -0,0 +1,33 @@
+from conftest import read_csv
+
+
+def bench_normalize_upload_frame(benchmark, demands_csv_bytes):
+    """Column normalization and NaN/NaT replacement done by `/upload-excel`."""
+    from ingest import normalize_upload_frame
+
+    df = read_csv(demands_csv_bytes)
+    benchmark.pedantic(
+        normalize_upload_frame,
+        setup=lambda: ((df.copy(),), {}),
+        rounds=10,
+    )
+
+
+def bench_infer_types(benchmark, demands_csv_bytes):
+    """Column normalization and typed ingest (dates, numbers, flags) done by `/upload-excel`."""
+    from ingest import infer_types, normalize_upload_frame
+
+    df = read_csv(demands_csv_bytes)
+    benchmark.pedantic(
+        lambda frame: infer_types(normalize_upload_frame(frame)),
+        setup=lambda: ((df.copy(),), {}),
+        rounds=10,
+    )
+
+
+def bench_frame_rows(benchmark, demands_csv_bytes):
+    """Conversion of the typed frame into bind parameters for the upsert."""
+    from ingest import infer_types, frame_rows, normalize_upload_frame
+
+    typed, column_types = infer_types(normalize_upload_frame(read_csv(demands_csv_bytes)))
+    benchmark.pedantic(frame_rows, args=(typed, column_types), rounds=10)
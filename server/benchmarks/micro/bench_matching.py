@@ -0,0 +1,24 @@
+import pytest
+
+TASK = "Need a Python developer for a FastAPI backend with PostgreSQL and Docker, React a plus"
+
+
+def bench_basic_keyword_matching(benchmark, employees):
+    from ai_agent import basic_keyword_matching
+
+    benchmark(basic_keyword_matching, TASK, employees)
+
+
+@pytest.mark.parametrize("skill,availability,team", [
+    ("react", None, None),
+    ("python", "Available", "Backend"),
+])
+def bench_filter_employees(benchmark, monkeypatch, tmp_path, employees, skill, availability, team):
+    import main
+    from employee_store import EmployeeStore
+
+    store = EmployeeStore(str(tmp_path))
+    store.publish(employees, fingerprint="bench", source="bench")
+    store.snapshot().employees()
+    monkeypatch.setattr(main, "employee_store", store)
+    benchmark(main.filter_employees, skill=skill, availability=availability, team=team)
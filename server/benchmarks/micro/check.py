@@ -0,0 +1,121 @@
+"""
+Run the kernel micro-benchmarks and compare them with the stored baseline.
+
+    python benchmarks/micro/check.py                 # fail if a median regressed > 25%
+    python benchmarks/micro/check.py --threshold 10
+    python benchmarks/micro/check.py --update        # record kernels missing from baseline.json
+    python benchmarks/micro/check.py --rerecord bench_decode_rows   # overwrite one kernel
+    python benchmarks/micro/check.py --rerecord all  # re-record everything
+
+The baseline stays fixed: `--update` only adds kernels it doesn't have yet,
+so a change can't hide its own regression by re-recording. Overwriting an
+entry takes `--rerecord`; say why in the commit that changes baseline.json.
+A kernel in the baseline that no longer runs fails the check.
+
+The baseline is only meaningful on comparable hardware; re-record it (`--rerecord
+all`) on the machine you check from.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "baseline.json")
+
+
+def run_suite(scale: int, extra=()):
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        cmd = [
+            sys.executable, "-m", "pytest", HERE, "-q", "-p", "no:cacheprovider",
+            f"--scale={scale}", f"--benchmark-json={path}", *extra,
+        ]
+        subprocess.run(cmd, check=True)
+        with open(path) as f:
+            data = json.load(f)
+    finally:
+        os.unlink(path)
+    return {
+        b["fullname"].split("::", 1)[1]: {
+            "median_ms": b["stats"]["median"] * 1000.0,
+            "mean_ms": b["stats"]["mean"] * 1000.0,
+            "rounds": b["stats"]["rounds"],
+        }
+        for b in data["benchmarks"]
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--threshold", type=float, default=25.0, help="allowed median slowdown in percent")
+    p.add_argument("--scale", type=int, default=None, help="defaults to the baseline's scale (or 10000)")
+    p.add_argument("--update", action="store_true", help="add kernels missing from the baseline instead of checking")
+    p.add_argument("--rerecord", action="append", default=[], metavar="KERNEL",
+                   help="overwrite a kernel's baseline (repeatable; `all` for every kernel)")
+    args = p.parse_args(argv)
+
+    baseline = None
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    scale = args.scale or (baseline or {}).get("scale", 10000)
+
+    current = run_suite(scale)
+
+    if args.update or args.rerecord or baseline is None:
+        if baseline is None or "all" in args.rerecord:
+            recorded = dict(current)
+        else:
+            recorded = dict(baseline["benchmarks"])
+            for name, stats in current.items():
+                if name not in recorded or name in args.rerecord:
+                    recorded[name] = stats
+            unknown = set(args.rerecord) - set(current)
+            if unknown:
+                print(f"not run, left as they were: {', '.join(sorted(unknown))}")
+        for name in sorted(set(recorded) - set((baseline or {}).get("benchmarks", {}))):
+            print(f"recorded {name}")
+        for name in sorted(n for n in args.rerecord if n in current or n == "all"):
+            print(f"re-recorded {name}")
+        with open(BASELINE, "w") as f:
+            json.dump({
+                "scale": scale,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "benchmarks": recorded,
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {BASELINE}")
+        return 0
+
+    if scale != baseline["scale"]:
+        print(f"note: scale {scale} differs from baseline scale {baseline['scale']}")
+
+    failed = []
+    for name, stats in sorted(current.items()):
+        base = baseline["benchmarks"].get(name)
+        if not base:
+            print(f"{name:<52} {stats['median_ms']:>10.3f} ms   (new)")
+            continue
+        delta = (stats["median_ms"] - base["median_ms"]) / base["median_ms"] * 100.0
+        flag = "REGRESSED" if delta > args.threshold else ""
+        print(f"{name:<52} {stats['median_ms']:>10.3f} ms {delta:+7.1f}% {flag}")
+        if flag:
+            failed.append(name)
+    for name in sorted(set(baseline["benchmarks"]) - set(current)):
+        print(f"{name:<52} {'':>10}      MISSING (in baseline.json but not run)")
+        failed.append(name)
+
+    if failed:
+        print(f"{len(failed)} kernel(s) missing or slower than baseline by more than {args.threshold}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
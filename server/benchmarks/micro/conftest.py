@@ -0,0 +1,56 @@
+"""
+Fixtures for the kernel micro-benchmarks.
+
+Input size is set with `--scale` (rows / employees, default 10000). Inputs are
+built once per session from the seeded generators in `benchmarks.synthetic`.
+"""
+import io
+import os
+import sys
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from benchmarks import fake_gemini  # noqa: E402
+
+# Never reach the real Gemini API from a benchmark
+fake_gemini.install(latency_ms=0, jitter_ms=0)
+
+from benchmarks import synthetic  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption("--scale", type=int, default=10000, help="synthetic rows / employees per kernel")
+
+
+@pytest.fixture(scope="session")
+def scale(request):
+    return request.config.getoption("--scale")
+
+
+@pytest.fixture(scope="session")
+def demands_csv_bytes(scale):
+    return synthetic.demands_csv(scale)
+
+
+@pytest.fixture(scope="session")
+def demand_db_rows(demands_csv_bytes):
+    """Demand rows shaped like RealDictCursor output for the table `/upload-excel` creates."""
+    from ingest import infer_types, frame_rows, normalize_upload_frame
+
+    typed, column_types = infer_types(normalize_upload_frame(read_csv(demands_csv_bytes)))
+    return [dict(zip(typed.columns, row)) for row in frame_rows(typed, column_types)]
+
+
+@pytest.fixture(scope="session")
+def employees(scale):
+    return synthetic.employees(scale)
+
+
+def read_csv(data: bytes):
+    import pandas as pd
+
+    return pd.read_csv(io.BytesIO(data))
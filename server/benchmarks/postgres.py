@@ -0,0 +1,76 @@
+"""
+Postgres for the benchmarks.
+
+Either point at a local server through the usual PG* variables (`--pg env`)
+or start a throwaway embedded one with the optional `pgserver` package
+(`--pg embedded`). The PG* variables are exported before `db` is imported, so
+the app connects to whichever one was picked.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import psycopg2
+
+BENCH_DATABASE = "demand_bench"
+
+
+def _admin_connect(dbname: str):
+    return psycopg2.connect(
+        host=os.environ.get("PGHOST", "localhost"),
+        port=os.environ.get("PGPORT", "5432"),
+        user=os.environ.get("PGUSER", "postgres"),
+        password=os.environ.get("PGPASSWORD", ""),
+        dbname=dbname,
+    )
+
+
+def _recreate_database(name: str):
+    conn = _admin_connect("postgres")
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f'DROP DATABASE IF EXISTS "{name}"')
+    cur.execute(f'CREATE DATABASE "{name}"')
+    cur.close()
+    conn.close()
+
+
+@contextmanager
+def local_postgres(mode: str = "embedded"):
+    """
+    Yield a connection factory for a fresh benchmark database.
+
+    mode="embedded" starts pgserver in a temp dir, mode="env" uses the PG*
+    environment variables as-is.
+    """
+    pgdata = None
+    server = None
+    if mode == "embedded":
+        try:
+            import pgserver
+        except ImportError as e:
+            raise RuntimeError(
+                "Embedded Postgres needs the optional 'pgserver' package "
+                "(pip install -r benchmarks/requirements.txt) or use --pg env"
+            ) from e
+        pgdata = tempfile.mkdtemp(prefix="demand-bench-pg-")
+        server = pgserver.get_server(pgdata, cleanup_mode="stop")
+        info = server.get_postmaster_info()
+        os.environ["PGHOST"] = str(info.socket_dir)
+        os.environ["PGPORT"] = str(info.port)
+        os.environ["PGUSER"] = server.postgres_user
+        os.environ["PGPASSWORD"] = ""
+    elif mode != "env":
+        raise ValueError(f"Unknown Postgres mode: {mode}")
+
+    _recreate_database(BENCH_DATABASE)
+    os.environ["PGDATABASE"] = BENCH_DATABASE
+
+    try:
+        yield lambda: _admin_connect(BENCH_DATABASE)
+    finally:
+        if server is not None:
+            server.cleanup()
+        if pgdata:
+            shutil.rmtree(pgdata, ignore_errors=True)
@@ -0,0 +1,262 @@
+"""
+Offline replay of a captured AI request log (see `request_log.py`).
+
+Every successful request in the log is replayed in-process, with Gemini
+replaced by `fake_gemini` and without a database, through:
+
+    model     the recorded endpoint's own path against the stub model
+              (`get_ai_agent_recommendation` / `generate_sql_from_task`)
+    keyword   `basic_keyword_matching`, the no-API-key fallback
+    taxonomy  canonical-skill overlap: the skills the task mentions
+              (`SKILLS.mentioned`) against each employee's canonical skills
+
+For each path the report has p50/p95 latency and agreement with the recorded
+results (overlap of the top 10 ids and Jaccard over all ids; exact SQL match
+for the text-to-SQL endpoints), plus the recorded per-stage timings and the
+hit rate an LRU response cache would have had on the corpus, keyed either by
+the normalized task text or by the set of skills it mentions.
+
+Run from the `server/` directory:
+
+    python -m benchmarks.replay logs/ai_requests.jsonl --synthetic 1000
+
+Employees must match those the log was recorded against for the id agreement
+to mean anything: `--synthetic N` rebuilds the employees of
+`load_bench --employees N`, `--employees FILE` reads a JSON list.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from benchmarks import fake_gemini, synthetic  # noqa: E402
+from benchmarks.load_bench import percentile  # noqa: E402
+
+TOP_K = 10
+
+EMPLOYEE_ENDPOINTS = ("employees_ai_search", "employees_ai_sql_search")
+
+
+def normalize_task(task: str) -> str:
+    return " ".join(str(task or "").lower().split())
+
+
+def normalize_sql(sql) -> str:
+    return " ".join(str(sql or "").split()).rstrip(";").lower()
+
+
+def taxonomy_matching(task_description, employees):
+    """Employees ranked by how many of the task's skills they have (then availability)."""
+    from skills import SKILLS
+
+    mentioned = SKILLS.mentioned(task_description)
+    scored = []
+    for emp in employees:
+        overlap = len(mentioned.intersection(SKILLS.canonical(s) for s in emp.skills))
+        if overlap:
+            scored.append((overlap, emp.availability == "Available", emp))
+    scored.sort(key=lambda x: (x[0], x[1]), reverse=True)
+    return [emp for _, _, emp in scored]
+
+
+def agreement(replayed, recorded) -> dict:
+    replayed = [str(i) for i in replayed]
+    recorded = [str(i) for i in recorded]
+    top = set(recorded[:TOP_K])
+    union = set(replayed) | set(recorded)
+    return {
+        "overlap_at_k": len(top & set(replayed[:TOP_K])) / len(top) if top else float(not replayed),
+        "jaccard": len(set(replayed) & set(recorded)) / len(union) if union else 1.0,
+    }
+
+
+class LRUCache:
+    """Counts the hits an LRU cache of `size` entries would have had."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.lookups = 0
+
+    def lookup(self, key):
+        self.lookups += 1
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return
+        self.entries[key] = True
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def report(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else None,
+        }
+
+
+def latency_summary(values_ms) -> dict:
+    values = sorted(values_ms)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50), 3) if values else None,
+        "p95_ms": round(percentile(values, 95), 3) if values else None,
+        "mean_ms": round(sum(values) / len(values), 3) if values else None,
+    }
+
+
+def load_employees(args):
+    from data import mock_employees
+    from models import Employee
+    from skills import canonical_skills
+
+    if args.employees:
+        with open(args.employees, encoding="utf-8") as f:
+            employees = [Employee(**e) for e in json.load(f)]
+    elif args.synthetic:
+        employees = synthetic.employees(args.synthetic)
+    else:
+        employees = list(mock_employees)
+    # The server canonicalizes skills when it loads employees (employee_from_row)
+    return [e.model_copy(update={"skills": canonical_skills(e.skills)}) for e in employees]
+
+
+def replay(records, employees, cache_size: int) -> dict:
+    import ai_agent
+    from skills import ROLES, SKILLS
+
+    roles = sorted(set(ROLES.canonical_by_key.values()))
+    latencies = defaultdict(list)
+    scores = defaultdict(lambda: defaultdict(list))
+    sql_matches = defaultdict(list)
+    recorded_stages = defaultdict(list)
+    caches = {"task": LRUCache(cache_size), "skills": LRUCache(cache_size)}
+    replayed = skipped = 0
+
+    def timed(name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        latencies[name].append((time.perf_counter() - start) * 1000.0)
+        return result
+
+    for rec in records:
+        endpoint, task = rec.get("endpoint"), rec.get("task")
+        if rec.get("status") != 200 or not task:
+            skipped += 1
+            continue
+        replayed += 1
+
+        for stage, ms in (rec.get("timings_ms") or {}).items():
+            recorded_stages[f"{endpoint}.{stage}"].append(ms)
+        if rec.get("total_ms") is not None:
+            recorded_stages[f"{endpoint}.total"].append(rec["total_ms"])
+
+        caches["task"].lookup((endpoint, normalize_task(task)))
+        caches["skills"].lookup((endpoint, frozenset(SKILLS.mentioned(task))))
+
+        recorded_ids = rec.get("result_ids") or []
+        if endpoint == "employees_ai_search":
+            result = timed("model", ai_agent.get_ai_agent_recommendation, task, employees)
+            for metric, value in agreement([e.id for e in result], recorded_ids).items():
+                scores["model"][metric].append(value)
+        elif endpoint in ("employees_ai_sql_search", "demands_ai_sql_search"):
+            table = rec.get("table") or ("employees" if endpoint.startswith("employees") else "demands")
+            sql = timed("model_sql", ai_agent.generate_sql_from_task, task, table, roles)
+            sql_matches[endpoint].append(normalize_sql(sql) == normalize_sql(rec.get("sql")))
+        else:
+            continue
+
+        # The cheaper matchers only rank employees
+        if endpoint in EMPLOYEE_ENDPOINTS:
+            for name, matcher in (("keyword", ai_agent.basic_keyword_matching), ("taxonomy", taxonomy_matching)):
+                result = timed(name, matcher, task, employees)
+                for metric, value in agreement([e.id for e in result], recorded_ids).items():
+                    scores[name][metric].append(value)
+
+    return {
+        "records": {"replayed": replayed, "skipped": skipped},
+        "latency": {name: latency_summary(v) for name, v in latencies.items()},
+        "agreement": {
+            name: {metric: round(sum(v) / len(v), 4) for metric, v in metrics.items()}
+            for name, metrics in scores.items()
+        },
+        "sql_exact_match": {
+            endpoint: round(sum(v) / len(v), 4) for endpoint, v in sql_matches.items()
+        },
+        "recorded_stages": {name: latency_summary(v) for name, v in recorded_stages.items()},
+        "cache": {name: cache.report() for name, cache in caches.items()},
+    }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("log", nargs="+", help="AI request log(s) (JSON lines)")
+    p.add_argument("--employees", help="JSON file with the employees the log was recorded against")
+    p.add_argument("--synthetic", type=int, help="use the synthetic employees of load_bench --employees N")
+    p.add_argument("--gemini-latency-ms", type=float, default=400.0)
+    p.add_argument("--gemini-jitter-ms", type=float, default=150.0)
+    p.add_argument("--cache-size", type=int, default=1024, help="entries of the simulated LRU cache")
+    p.add_argument("--limit", type=int, help="replay at most this many records")
+    p.add_argument("--out", default=os.path.join(SERVER_DIR, "benchmarks", "results"))
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fake_gemini.install(args.gemini_latency_ms, args.gemini_jitter_ms)
+
+    import ai_agent
+    import request_log
+
+    # Replaying must not append to the log being replayed
+    request_log.AI_REQUEST_LOG = ""
+    ai_agent.API_KEY = "replay"
+
+    records = [rec for path in args.log for rec in request_log.read_log(path)]
+    if args.limit:
+        records = records[:args.limit]
+    employees = load_employees(args)
+    print(f"replaying {len(records)} requests against {len(employees)} employees")
+
+    report = replay(records, employees, args.cache_size)
+    report["meta"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "logs": args.log,
+        "employees": len(employees),
+        "gemini_latency_ms": args.gemini_latency_ms,
+        "gemini_jitter_ms": args.gemini_jitter_ms,
+        "cache_size": args.cache_size,
+        "top_k": TOP_K,
+    }
+
+    for name, r in report["latency"].items():
+        quality = report["agreement"].get(name, {})
+        print(
+            f"{name:<10} p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  "
+            f"overlap@{TOP_K} {quality.get('overlap_at_k')}  jaccard {quality.get('jaccard')}"
+        )
+    for endpoint, rate in report["sql_exact_match"].items():
+        print(f"sql exact match {endpoint}: {rate}")
+    for name, r in report["cache"].items():
+        print(f"cache by {name:<7} hit rate {r['hit_rate']} ({r['hits']}/{r['lookups']})")
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(args.out, f"replay-{stamp}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Synthetic data generators for the benchmarks.
+
+Demands are modeled on `data-*-demands.csv` (same columns, same value mix and
+the same mixed date formats). Employees follow the `Employee` model.
+Everything is driven by a seeded RNG so two runs at the same scale see the
+same data.
+"""
+import csv
+import io
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+from models import Employee
+
+DEMAND_COLUMNS = [
+    "sno", "id", "project_id", "account_id", "role", "roleCode", "location", "revised",
+    "originalStartDate", "allocationEndDate", "allocationPercentage", "probability", "status",
+    "resourceMapped", "comment", "lastUpdatedBy", "updatedOn", "addedBy", "addedOn",
+    "startMonth", "billingRate", "fulfillmentDate",
+]
+
+# (role, roleCode, weight) - weights follow the sample export
+ROLES = [
+    ("Application Engineer", "AE", 155),
+    ("QA Engineer", "QA", 58),
+    ("Application Engineering Lead", "AE Lead", 49),
+    ("Sr. Application Engineer", "Sr. AE", 39),
+    ("UX Engineer", "UXE", 35),
+    ("Solution Architect", "SA", 33),
+    ("UX Designer", "UXD", 18),
+    ("Business Analyst", "BA", 18),
+    ("Scrum Master", "Scrum", 12),
+    ("DevOps Engineer", "DevOps", 10),
+]
+LOCATIONS = [("Offshore", 423), ("Onshore", 84)]
+STATUSES = [
+    ("Allocated", 254), ("Abandoned", 175), ("Mapped", 43), ("Mapped-Interview Pending", 14),
+    ("Open", 10), ("On Hold", 8), ("Mapped-Yet to Join", 3),
+]
+PROBABILITIES = [(100, 308), (90, 110), (75, 61), (50, 28)]
+ALLOCATIONS = [(100, 463), (50, 31), (25, 11), (75, 1), (99, 1)]
+BILLING_RATES = [(None, 238), (0.0, 152), (45.0, 20), (35.2, 12), (25.0, 11), (40.0, 8), (32.0, 7)]
+COMMENTS = [
+    (None, 377), ("Accelarator", 10), ("Exact role to be confirmed", 9), ("Insuremo", 6),
+    ("Opp to be confirmed", 5), ("Subhub", 5), ("Trained in both Unqork & EIgen", 4),
+]
+MAPPED = [(None, 283), ("Y", 9), ("N", 5), ("Kalyan", 4), ("Harsha", 3), ("To Be Identified", 3)]
+
+SKILLS = [
+    "React", "JavaScript", "TypeScript", "CSS", "HTML", "Python", "FastAPI", "PostgreSQL",
+    "Docker", "Node.js", "MongoDB", "GraphQL", "DevOps", "Kubernetes", "AWS", "Terraform",
+    "Machine Learning", "TensorFlow", "Data Analysis", "Java", "Spring Boot", "Go", "Azure",
+    "Selenium", "Figma", "Unqork", "Scrum", "SQL",
+]
+QUALIFICATIONS = [
+    "B.Tech CS", "B.Tech IT", "M.Tech", "M.S. Data Science", "Full Stack Developer",
+    "Backend Developer", "DevOps Engineer", "ML Engineer", "Cloud Architect Certification",
+]
+AVAILABILITY = [("Available", 5), ("Partially Available", 3), ("Not Available", 2)]
+TEAMS = ["Frontend", "Backend", "Full Stack", "Infrastructure", "AI/ML", "QA", "UX", "Data"]
+FIRST_NAMES = ["Alice", "Bob", "Carol", "David", "Emma", "Farah", "Gopal", "Hana", "Ivan", "Jia"]
+LAST_NAMES = ["Johnson", "Smith", "Davis", "Wilson", "Taylor", "Iyer", "Khan", "Lopez", "Ng", "Rao"]
+
+
+def _weighted(rng: random.Random, choices):
+    values = [c[0] for c in choices]
+    weights = [c[1] for c in choices]
+    return rng.choices(values, weights=weights)[0]
+
+
+def _fmt_date(rng: random.Random, d: datetime) -> str:
+    # The export is month-first throughout, as MM-DD-YYYY or M/D/YYYY
+    if rng.random() < 0.7:
+        return d.strftime("%m-%d-%Y")
+    return f"{d.month}/{d.day}/{d.year}"
+
+
+def iter_demand_rows(count: int, seed: int = 42, start: int = 1) -> Iterator[dict]:
+    """Yield `count` demand rows keyed by the CSV column names."""
+    rng = random.Random(seed + start)
+    base = datetime(2025, 1, 1)
+    projects = [f"PRJ-{i:05d}" for i in range(max(1, count // 25))]
+    accounts = [f"ACC-{i:05d}" for i in range(max(1, count // 200))]
+
+    for n in range(start, start + count):
+        role, role_code = rng.choices([(r[0], r[1]) for r in ROLES], weights=[r[2] for r in ROLES])[0]
+        start_date = base + timedelta(days=rng.randrange(0, 330))
+        added = start_date - timedelta(days=rng.randrange(0, 60), hours=rng.randrange(0, 24))
+        end_date = start_date + timedelta(days=rng.randrange(30, 365)) if rng.random() < 0.3 else None
+        fulfilled = start_date + timedelta(days=rng.randrange(0, 30)) if rng.random() < 0.8 else None
+        yield {
+            "sno": n,
+            "id": f"DEM-{n:012d}",
+            "project_id": rng.choice(projects),
+            "account_id": rng.choice(accounts),
+            "role": role,
+            "roleCode": role_code,
+            "location": _weighted(rng, LOCATIONS),
+            "revised": _fmt_date(rng, start_date + timedelta(days=14)) if rng.random() < 0.1 else None,
+            "originalStartDate": _fmt_date(rng, start_date),
+            "allocationEndDate": _fmt_date(rng, end_date) if end_date else None,
+            "allocationPercentage": _weighted(rng, ALLOCATIONS),
+            "probability": _weighted(rng, PROBABILITIES),
+            "status": _weighted(rng, STATUSES),
+            "resourceMapped": _weighted(rng, MAPPED),
+            "comment": _weighted(rng, COMMENTS),
+            "lastUpdatedBy": "Yogi B",
+            "updatedOn": added.strftime("%m-%d-%Y %H:%M"),
+            "addedBy": "Yogi B",
+            "addedOn": added.strftime("%m-%d-%Y %H:%M"),
+            "startMonth": start_date.strftime("%y-%b"),
+            "billingRate": _weighted(rng, BILLING_RATES),
+            "fulfillmentDate": _fmt_date(rng, fulfilled) if fulfilled else None,
+        }
+
+
+def demands_csv(count: int, seed: int = 42, start: int = 1, header: bool = True) -> bytes:
+    """Render synthetic demands as CSV bytes, in the layout of the real export."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=DEMAND_COLUMNS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    for row in iter_demand_rows(count, seed=seed, start=start):
+        writer.writerow({k: ("" if v is None else v) for k, v in row.items()})
+    return buf.getvalue().encode()
+
+
+def iter_employee_rows(count: int, seed: int = 7) -> Iterator[dict]:
+    """Yield `count` employee rows as plain dicts (the `Employee` fields)."""
+    rng = random.Random(seed)
+    for n in range(1, count + 1):
+        yield {
+            "id": n,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {n}",
+            "skills": rng.sample(SKILLS, rng.randint(2, 6)),
+            "qualifications": rng.sample(QUALIFICATIONS, rng.randint(1, 3)),
+            "strength": rng.randint(50, 100),
+            "availability": _weighted(rng, AVAILABILITY),
+            "team": rng.choice(TEAMS),
+        }
+
+
+def employees(count: int, seed: int = 7) -> List[Employee]:
+    """Synthetic employees as `Employee` models."""
+    return [Employee(**row) for row in iter_employee_rows(count, seed=seed)]
+
+
+def employees_copy_buffer(count: int, seed: int = 7) -> io.StringIO:
+    """Synthetic employees in COPY text format, with skills/qualifications as JSON text."""
+    buf = io.StringIO()
+    for row in iter_employee_rows(count, seed=seed):
+        fields = [
+            str(row["id"]), row["name"], json.dumps(row["skills"]), json.dumps(row["qualifications"]),
+            str(row["strength"]), row["availability"], row["team"],
+        ]
+        buf.write("\t".join(f.replace("\\", "\\\\") for f in fields) + "\n")
+    buf.seek(0)
+    return buf
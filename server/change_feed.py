@@ -0,0 +1,240 @@
+"""
+Live change feed for the `demands` table.
+
+Ingest announces changed rows with pg_notify on CHANNEL inside the load
+transaction, so events go out only when (and if) it commits. Changes too big
+for a delta are announced with `announce_resync()` once the new demands
+snapshot is published, so the refetch it triggers sees the new data.
+
+Every worker runs one listener thread on a dedicated connection: it loads the
+changed rows once and fans the delta out to all `/demands/stream`
+subscribers, so N open dashboards cost one query per change instead of N full
+refetches.
+
+Events handed to subscribers:
+    {"type": "demands", "inserted": [row, ...], "updated": [row, ...]}
+    {"type": "resync"}   the change can't be expressed as a delta (or the
+                         subscriber fell behind, or the listener reconnected
+                         and may have missed notifications): refetch `/demands`
+"""
+import asyncio
+import json
+import os
+import select
+import threading
+from typing import List
+
+from db import dedicated_connection, execute_read_query, get_connection, release_connection
+from demand_snapshot import json_default
+
+CHANNEL = "demands_changes"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD = 7500
+
+# Larger changes are announced as a resync instead of a row delta
+MAX_DELTA_ROWS = int(os.getenv("CHANGE_FEED_MAX_ROWS", "5000"))
+
+# Events buffered per subscriber before it is told to resync instead
+SUBSCRIBER_QUEUE = 100
+
+# Seconds between reconnect attempts when the listener loses its connection
+RECONNECT_DELAY = 2.0
+
+
+def notify_changes(cur, inserted_ids: List, updated_ids: List) -> bool:
+    """
+    Queue change notifications for the rows an ingest touched. Call on the
+    loading cursor before commit; ids are split over as many NOTIFYs as needed.
+    Returns False, queuing nothing, when the change is too big for a delta:
+    call `announce_resync()` after publishing the snapshot instead.
+    """
+    if len(inserted_ids) + len(updated_ids) > MAX_DELTA_ROWS:
+        return False
+    for op, ids in (("inserted", inserted_ids), ("updated", updated_ids)):
+        batch = []
+        size = 0
+        for row_id in ids:
+            encoded = json.dumps(str(row_id))
+            if batch and size + len(encoded) + 40 > MAX_PAYLOAD:
+                cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps({op: batch})))
+                batch, size = [], 0
+            batch.append(str(row_id))
+            size += len(encoded) + 1
+        if batch:
+            cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps({op: batch})))
+    return True
+
+
+def notify_resync(cur):
+    """Tell subscribers to refetch (changes without row ids)."""
+    cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps({"resync": True})))
+
+
+def announce_resync():
+    """Tell subscribers in every worker to refetch, now (own transaction)."""
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        notify_resync(cur)
+        conn.commit()
+        cur.close()
+    finally:
+        release_connection(conn)
+
+
+def _encode_rows(rows: List[dict]) -> List[dict]:
+    # Same JSON shapes as the `/demands` listing (dates as ISO strings, ...)
+    return json.loads(json.dumps(rows, default=json_default))
+
+
+class ChangeFeed:
+    """
+    One LISTEN connection per worker, fanned out to asyncio subscriber queues.
+    `before_resync` runs before a resync is handed out, e.g. to make this
+    worker re-check the demands snapshot the refetch will read.
+    """
+
+    def __init__(self, before_resync=None):
+        self.before_resync = before_resync
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.connected = False
+        self.events = 0
+
+    # ---------- subscribers (event loop side) ----------
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind to patch incrementally: drop the backlog
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({"type": "resync"})
+
+    def publish(self, event: dict):
+        """Hand an event to every subscriber (thread-safe)."""
+        self.events += 1
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Subscriber's event loop is closed
+                self.unsubscribe(queue)
+
+    # ---------- listener thread ----------
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="demands-change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _resync(self):
+        if self.before_resync is not None:
+            try:
+                self.before_resync()
+            except Exception as e:
+                print(f"Change feed: before_resync failed: {e}")
+        self.publish({"type": "resync"})
+
+    def _run(self):
+        connected_before = False
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = dedicated_connection()
+                conn.autocommit = True
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {CHANNEL};")
+                self.connected = True
+                # Notifications sent while disconnected are lost
+                if connected_before:
+                    self._resync()
+                connected_before = True
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    payloads = [n.payload for n in conn.notifies]
+                    conn.notifies.clear()
+                    if payloads:
+                        self._handle(payloads)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"Change feed: listener error, reconnecting: {e}")
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(RECONNECT_DELAY)
+
+    def _handle(self, payloads: List[str]):
+        """Coalesce a burst of notifications into one delta event."""
+        inserted, updated = [], []
+        for raw in payloads:
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            if message.get("resync"):
+                self._resync()
+                return
+            inserted.extend(message.get("inserted", []))
+            updated.extend(message.get("updated", []))
+
+        # A row inserted and then updated in the same burst is still new to clients
+        inserted_set = set(inserted)
+        updated = [i for i in dict.fromkeys(updated) if i not in inserted_set]
+        inserted = list(dict.fromkeys(inserted))
+        if not inserted and not updated:
+            return
+        if len(inserted) + len(updated) > MAX_DELTA_ROWS:
+            self.publish({"type": "resync"})
+            return
+
+        try:
+            rows = execute_read_query(
+                "SELECT * FROM demands WHERE id::text = ANY(%s) ORDER BY id DESC;",
+                (inserted + updated,),
+            )
+        except Exception as e:
+            print(f"Change feed: could not load changed rows: {e}")
+            self.publish({"type": "resync"})
+            return
+
+        rows = _encode_rows(rows)
+        by_id = {str(r.get("id")): r for r in rows}
+        self.publish({
+            "type": "demands",
+            "inserted": [by_id[i] for i in inserted if i in by_id],
+            "updated": [by_id[i] for i in updated if i in by_id],
+        })
@@ -1,8 +1,8 @@
 import os
 import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import threading
 from dotenv import load_dotenv
+from startup import lazy_import
 
 load_dotenv()
 
@@ -13,8 +13,25 @@ DB_NAME = os.getenv("PGDATABASE", "DemandPlanning")
 DB_USER = os.getenv("PGUSER", "postgres")
 DB_PASS = os.getenv("PGPASSWORD", "")
 
+# Connection pool size (per worker process)
+POOL_MIN = int(os.getenv("PGPOOL_MIN", "1"))
+POOL_MAX = int(os.getenv("PGPOOL_MAX", "20"))
 
-def get_connection():
+_pool = None
+_pool_lock = threading.Lock()
+# ids of connections opened outside the pool (pool exhausted / unavailable)
+_unpooled = set()
+
+
+def _connection_error(e):
+    # Provide a clearer error message to help debugging env/config issues
+    return RuntimeError(
+        f"Error connecting to Postgres at {DB_HOST}:{DB_PORT} using database '{DB_NAME}' and user '{DB_USER}': {e}"
+    )
+
+
+def _connect():
+    psycopg2 = lazy_import("psycopg2")
     try:
         conn = psycopg2.connect(
             host=DB_HOST,
@@ -25,38 +42,129 @@ def get_connection():
         )
         return conn
     except Exception as e:
-        # Provide a clearer error message to help debugging env/config issues
-        msg = (
-            f"Error connecting to Postgres at {DB_HOST}:{DB_PORT} using database '{DB_NAME}' and user '{DB_USER}': {e}"
-        )
-        raise RuntimeError(msg) from e
+        raise _connection_error(e) from e
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+    Raises RuntimeError if the database cannot be reached.
+    """
+    global _pool
+    if _pool is None:
+        pool_module = lazy_import("psycopg2.pool")
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = pool_module.ThreadedConnectionPool(
+                        POOL_MIN,
+                        POOL_MAX,
+                        host=DB_HOST,
+                        port=DB_PORT,
+                        dbname=DB_NAME,
+                        user=DB_USER,
+                        password=DB_PASS,
+                    )
+                except Exception as e:
+                    raise _connection_error(e) from e
+    return _pool
+
+
+def get_connection():
+    """
+    Take a connection from the pool. Hand it back with `release_connection`.
+    Falls back to a dedicated connection when the pool is exhausted.
+    """
+    pool = get_pool()
+    PoolError = lazy_import("psycopg2.pool").PoolError
+    try:
+        conn = pool.getconn()
+    except PoolError:
+        conn = _connect()
+        _unpooled.add(id(conn))
+        return conn
+
+    if conn.closed:
+        # Server restarted or connection dropped while idle
+        pool.putconn(conn, close=True)
+        return get_connection()
+    return conn
+
+
+def dedicated_connection():
+    """A connection outside the pool for long-lived sessions (e.g. LISTEN). Close it when done."""
+    return _connect()
+
+
+def release_connection(conn):
+    """Return a connection from `get_connection` to the pool (or close it)."""
+    if id(conn) in _unpooled:
+        _unpooled.discard(id(conn))
+        conn.close()
+    elif _pool is not None:
+        _pool.putconn(conn, close=bool(conn.closed))
+    else:
+        conn.close()
+
+
+def warm_pool():
+    """Open the pool's minimum connections and check one with a round trip."""
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchone()
+        cur.close()
+    finally:
+        release_connection(conn)
+
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
 
 
 def execute_read_query(query: str, params=None):
     """
     Execute a read-only SQL query and return rows as list of dicts.
     """
+    extras = lazy_import("psycopg2.extras")
     conn = None
     try:
         conn = get_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur = conn.cursor(cursor_factory=extras.RealDictCursor)
         cur.execute(query, params or ())
         rows = cur.fetchall()
         cur.close()
-        # convert to normal Python types (e.g., json fields)
-        results = []
-        for r in rows:
-            row = dict(r)
-            # attempt to decode JSON-like columns if strings
-            for k, v in row.items():
-                if isinstance(v, str):
-                    try:
-                        parsed = json.loads(v)
-                        row[k] = parsed
-                    except Exception:
-                        pass
-            results.append(row)
-        return results
+        return decode_rows(rows)
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
+
+
+# First characters of anything json.loads accepts (incl. NaN / Infinity)
+_JSON_START = frozenset('[{"-0123456789tfnNI')
+
+
+def decode_rows(rows):
+    """
+    Convert cursor rows to plain dicts, decoding JSON-like string values
+    (e.g. JSON arrays stored as TEXT).
+    """
+    results = []
+    for r in rows:
+        row = dict(r)
+        # attempt to decode JSON-like columns if strings
+        for k, v in row.items():
+            # json.loads can only succeed if the first non-blank character can
+            # start a JSON value; skipping the rest avoids a raised exception per cell
+            if isinstance(v, str) and v.lstrip()[:1] in _JSON_START:
+                try:
+                    parsed = json.loads(v)
+                    row[k] = parsed
+                except Exception:
+                    pass
+        results.append(row)
+    return results
@@ -0,0 +1,332 @@
+"""
+Columnar snapshot of the `demands` table, shared by all uvicorn workers.
+
+Published at the end of every `/upload-excel` into `demands` (and by the
+refresher when the table changes underneath us), then memory-mapped by each
+worker. Listing and analytics read the snapshot instead of re-fetching and
+re-decoding the table; Postgres is only needed for writes and freshness checks.
+
+A snapshot is a directory `demands-<version>/` (see snapshots.py) with:
+    meta.json   column order, row count and per-column encoding
+    c<i>.*.npy  column arrays, opened with np.load(mmap_mode="r")
+    rows.json   the rows as `/demands` returns them (ORDER BY id DESC)
+
+Column encodings:
+    int       c<i>.values.npy int64 + c<i>.valid.npy bool
+    float     c<i>.values.npy float64, NaN for NULL
+    datetime  c<i>.values.npy datetime64[us], NaT for NULL
+    dict      c<i>.codes.npy int32 (-1 for NULL) into meta "categories"
+"""
+import json
+import mmap
+import os
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import List, Optional
+
+from db import execute_read_query, get_connection, release_connection
+from snapshots import SnapshotStore
+from startup import lazy_import
+
+# Seconds between freshness checks of the demands table (0 disables the refresher)
+REFRESH_INTERVAL = float(os.getenv("DEMAND_SNAPSHOT_REFRESH", "30"))
+
+INT64_MIN, INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float, Decimal)) and not isinstance(v, bool)
+
+
+def _naive_utc(v):
+    # datetime64 has no time zone: store aware timestamps as naive UTC
+    if isinstance(v, datetime) and v.tzinfo is not None:
+        return v.astimezone(timezone.utc).replace(tzinfo=None)
+    return v
+
+
+def _column_kind(values) -> str:
+    non_null = [v for v in values if v is not None]
+    if not non_null:
+        return "dict"
+    if all(isinstance(v, int) and not isinstance(v, bool) and INT64_MIN <= v <= INT64_MAX for v in non_null):
+        return "int"
+    if all(_is_number(v) for v in non_null):
+        return "float"
+    if all(isinstance(v, datetime) for v in non_null) or all(
+        isinstance(v, date) and not isinstance(v, datetime) for v in non_null
+    ):
+        return "datetime"
+    return "dict"
+
+
+def json_default(v):
+    # Same conversions FastAPI's jsonable_encoder applies to these types
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return int(v) if v.as_tuple().exponent >= 0 else float(v)
+    if isinstance(v, (bytes, memoryview)):
+        return bytes(v).decode()
+    return str(v)
+
+
+def _category_key(v):
+    # Hashable stand-in for dictionary encoding (decoded JSON columns hold lists/dicts)
+    if isinstance(v, (list, dict)):
+        return ("json", json.dumps(v, sort_keys=True, default=json_default))
+    return (type(v).__name__, v)
+
+
+def write_demand_snapshot(path: str, rows: List[dict]) -> dict:
+    """Write rows (already in listing order) as a columnar snapshot directory at `path`."""
+    np = lazy_import("numpy")
+
+    os.makedirs(path, exist_ok=True)
+    columns = list(rows[0].keys()) if rows else []
+    column_meta = []
+
+    for i, col in enumerate(columns):
+        values = [r.get(col) for r in rows]
+        kind = _column_kind(values)
+        entry = {"name": col, "kind": kind}
+
+        if kind == "int":
+            valid = np.array([v is not None for v in values], dtype=bool)
+            data = np.array([v if v is not None else 0 for v in values], dtype=np.int64)
+            np.save(os.path.join(path, f"c{i}.values.npy"), data)
+            np.save(os.path.join(path, f"c{i}.valid.npy"), valid)
+        elif kind == "float":
+            data = np.array([float(v) if v is not None else np.nan for v in values], dtype=np.float64)
+            np.save(os.path.join(path, f"c{i}.values.npy"), data)
+        elif kind == "datetime":
+            if any(isinstance(v, datetime) and v.tzinfo is not None for v in values):
+                values = [_naive_utc(v) for v in values]
+            # pandas converts the whole list in C (None -> NaT), numpy per value
+            try:
+                data = lazy_import("pandas").DatetimeIndex(values).to_numpy().astype("datetime64[us]")
+            except (ValueError, OverflowError):
+                # Out of the range of older pandas versions
+                data = np.array(values, dtype="datetime64[us]")
+            np.save(os.path.join(path, f"c{i}.values.npy"), data)
+        elif all(v is None or type(v) is str for v in values):
+            # Text: pandas dictionary-encodes in first-seen order, None -> -1
+            codes, categories = lazy_import("pandas").factorize(np.array(values, dtype=object))
+            np.save(os.path.join(path, f"c{i}.codes.npy"), codes.astype(np.int32))
+            entry["categories"] = categories.tolist()
+        else:
+            # Dictionary-encode in first-seen order
+            index = {}
+            categories = []
+            codes = np.empty(len(values), dtype=np.int32)
+            for n, v in enumerate(values):
+                if v is None:
+                    codes[n] = -1
+                    continue
+                key = _category_key(v)
+                code = index.get(key)
+                if code is None:
+                    code = index[key] = len(categories)
+                    categories.append(v)
+                codes[n] = code
+            np.save(os.path.join(path, f"c{i}.codes.npy"), codes)
+            entry["categories"] = json.loads(json.dumps(categories, default=json_default))
+
+        column_meta.append(entry)
+
+    # One json.dumps call: json.dump streams through the pure-Python encoder
+    listing = json.dumps(rows, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=json_default)
+    with open(os.path.join(path, "rows.json"), "w") as f:
+        f.write(listing)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"count": len(rows), "columns": column_meta}, f)
+
+    return {"count": len(rows)}
+
+
+class DemandSnapshot:
+    """
+    One mapped snapshot version. Every file is mapped when the version is
+    opened, so it stays readable after a later publish deletes the directory.
+    """
+
+    def __init__(self, path: str, meta: dict):
+        with open(os.path.join(path, "meta.json")) as f:
+            layout = json.load(f)
+        self.path = path
+        self.meta = meta
+        self.version = meta["version"]
+        self.count = layout["count"]
+        self._columns = {c["name"]: (i, c) for i, c in enumerate(layout["columns"])}
+        self.columns = [c["name"] for c in layout["columns"]]
+        # Column files are c<index>.<part>.npy, part "values", "valid" or "codes"
+        np = lazy_import("numpy")
+        self._arrays = {}
+        for entry in os.listdir(path):
+            if entry.startswith("c") and entry.endswith(".npy"):
+                i, part = entry[1:-len(".npy")].split(".")
+                name = layout["columns"][int(i)]["name"]
+                self._arrays[(name, part)] = np.load(os.path.join(path, entry), mmap_mode="r")
+
+        with open(os.path.join(path, "rows.json"), "rb") as f:
+            self._rows = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, col):
+        return col in self._columns
+
+    def rows_json(self) -> bytes:
+        """All rows, already serialized in `/demands` order."""
+        return self._rows[:] if self._rows is not None else b"[]"
+
+    def kind(self, col: str) -> str:
+        return self._columns[col][1]["kind"]
+
+    def categories(self, col: str) -> list:
+        return self._columns[col][1].get("categories", [])
+
+    def array(self, col: str, part: str):
+        """Memory-mapped array for a column: part is "values", "valid" or "codes"."""
+        return self._arrays[(col, part)]
+
+    def null_mask(self, col: str):
+        np = lazy_import("numpy")
+        kind = self.kind(col)
+        if kind == "int":
+            return ~self.array(col, "valid")
+        if kind == "float":
+            return np.isnan(self.array(col, "values"))
+        if kind == "datetime":
+            return np.isnat(self.array(col, "values"))
+        return self.array(col, "codes") < 0
+
+    def value_counts(self, col: str):
+        """
+        ([(value, count), ...] sorted by count descending, number of NULLs).
+        Ties keep first-seen order for dictionary columns.
+        """
+        np = lazy_import("numpy")
+        kind = self.kind(col)
+        if kind == "dict":
+            codes = self.array(col, "codes")
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.categories(col)))
+            cats = self.categories(col)
+            order = np.argsort(-counts, kind="stable")
+            pairs = [(cats[i], int(counts[i])) for i in order if counts[i] > 0]
+            return pairs, int((codes < 0).sum())
+
+        values = self.array(col, "values")
+        nulls = self.null_mask(col)
+        present = values[~nulls]
+        uniq, counts = np.unique(present, return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        if kind == "datetime":
+            items = uniq.astype("datetime64[us]").astype(object)
+        else:
+            items = uniq.tolist()
+        return [(items[i], int(counts[i])) for i in order], int(nulls.sum())
+
+    def numeric(self, col: str):
+        """Non-null values of a column as float64 (numbers inside dictionary columns included)."""
+        np = lazy_import("numpy")
+        kind = self.kind(col)
+        if kind == "int":
+            return self.array(col, "values")[self.array(col, "valid")].astype(np.float64)
+        if kind == "float":
+            values = self.array(col, "values")
+            return values[~np.isnan(values)]
+        if kind == "dict":
+            cats = self.categories(col)
+            lookup = np.array([float(c) if _is_number(c) else np.nan for c in cats] or [np.nan])
+            codes = self.array(col, "codes")
+            values = lookup[codes[codes >= 0]]
+            return values[~np.isnan(values)]
+        return np.empty(0)
+
+    def mean(self, col: str) -> Optional[float]:
+        values = self.numeric(col)
+        return float(values.mean()) if len(values) else None
+
+    def group_mean(self, by: str, col: str):
+        """[(group value, mean of col)] for a dictionary column `by`; groups without numbers get None."""
+        np = lazy_import("numpy")
+        if self.kind(by) != "dict":
+            raise ValueError(f"group_mean needs a dictionary-encoded column, got {by}")
+        cats = self.categories(by)
+        codes = np.asarray(self.array(by, "codes"))
+
+        kind = self.kind(col)
+        if kind == "int":
+            values = np.where(self.array(col, "valid"), self.array(col, "values"), 0).astype(np.float64)
+            present = np.asarray(self.array(col, "valid"))
+        elif kind == "float":
+            raw = self.array(col, "values")
+            present = ~np.isnan(raw)
+            values = np.where(present, raw, 0.0)
+        elif kind == "dict":
+            col_cats = self.categories(col)
+            lookup = np.array([float(c) if _is_number(c) else np.nan for c in col_cats] + [np.nan])
+            raw = lookup[self.array(col, "codes")]  # -1 -> trailing NaN
+            present = ~np.isnan(raw)
+            values = np.where(present, raw, 0.0)
+        else:
+            return [(c, None) for c in cats]
+
+        keep = (codes >= 0) & present
+        sums = np.bincount(codes[keep], weights=values[keep], minlength=len(cats))
+        counts = np.bincount(codes[keep], minlength=len(cats))
+        has_group = np.bincount(codes[codes >= 0], minlength=len(cats)) > 0
+        return [
+            (cats[i], float(sums[i] / counts[i]) if counts[i] else None)
+            for i in range(len(cats))
+            if has_group[i]
+        ]
+
+    def distinct(self, col: str) -> list:
+        """Distinct non-null values of a column."""
+        if col not in self:
+            return []
+        return [v for v, _ in self.value_counts(col)[0]]
+
+
+class DemandSnapshotStore(SnapshotStore):
+    """Per-worker handle on the shared demands snapshot."""
+
+    name = "demands"
+    suffix = "/"
+    fallback_when_unreachable = False
+
+    def start_refresher(self, interval: float = REFRESH_INTERVAL):
+        super().start_refresher(interval)
+
+    def source_fingerprint(self) -> Optional[str]:
+        # Row count plus the newest row version: any insert/update raises
+        # max(xmin), deletes change the count. No row data is decoded.
+        errors = lazy_import("psycopg2.errors")
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT count(*), max(xmin::text::bigint) FROM demands")
+            except errors.UndefinedTable:
+                return None
+            count, newest = cur.fetchone()
+            cur.close()
+            return f"{count}:{newest}"
+        finally:
+            release_connection(conn)
+
+    def load_source(self) -> List[dict]:
+        return execute_read_query("SELECT * FROM demands ORDER BY id DESC;")
+
+    def fallback_source(self) -> List[dict]:
+        # No demands table yet: serve an empty dataset
+        return []
+
+    def write(self, path: str, rows: List[dict]):
+        return write_demand_snapshot(path, rows)
+
+    def open(self, path: str, meta: dict) -> DemandSnapshot:
+        return DemandSnapshot(path, meta)
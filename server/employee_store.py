@@ -0,0 +1,216 @@
+"""
+Shared, read-only employee snapshot for all uvicorn workers.
+
+The employees table is serialized once into a versioned snapshot file (see
+snapshots.py) and every worker memory-maps it read-only, so N workers share
+one copy instead of holding N drifting lists.
+
+File layout (little endian):
+    header   magic "EMPSNAP1", count (u64), json_len (u64)
+    ids      int64[count], sorted
+    offsets  uint64[count]   start of each record in the JSON payload
+    lengths  uint32[count]
+    payload  JSON array of the employees, as the API returns them
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from models import Employee
+from data import mock_employees
+from db import get_connection, release_connection, decode_rows
+from skills import SKILLS, canonical_skills
+from snapshots import SnapshotStore
+from startup import lazy_import
+
+MAGIC = b"EMPSNAP1"
+HEADER = struct.Struct("<8sQQ")
+
+# Seconds between checks of the employees table (0 disables the refresher)
+REFRESH_INTERVAL = float(os.getenv("EMPLOYEE_SNAPSHOT_REFRESH", "30"))
+
+
+def employee_from_row(r: dict) -> Employee:
+    """Best-effort mapping of an `employees` row to an Employee. Raises on invalid rows."""
+    return Employee(
+        id=int(r.get('id')),
+        name=r.get('name') or r.get('full_name') or 'Unknown',
+        skills=canonical_skills(r.get('skills') if isinstance(r.get('skills'), list) else (json.loads(r.get('skills')) if r.get('skills') else [])),
+        qualifications=r.get('qualifications') if isinstance(r.get('qualifications'), list) else (json.loads(r.get('qualifications')) if r.get('qualifications') else []),
+        strength=int(r.get('strength') or 0),
+        availability=r.get('availability') or 'Unknown',
+        team=r.get('team') or 'Unknown'
+    )
+
+
+class EmployeeSnapshot:
+    """One mapped snapshot version. Lookups read straight from the mapping."""
+
+    def __init__(self, path: str, meta: dict):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, json_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not an employee snapshot: {path}")
+
+        view = memoryview(self._mm)
+        pos = HEADER.size
+        self.ids = view[pos:pos + 8 * count].cast("q")
+        pos += 8 * count
+        self.offsets = view[pos:pos + 8 * count].cast("Q")
+        pos += 8 * count
+        self.lengths = view[pos:pos + 4 * count].cast("I")
+        pos += 4 * count
+        self.payload = view[pos:pos + json_len]
+
+        self.meta = meta
+        self.version = meta["version"]
+        self._employees = None
+        self._decoded: Dict[int, Employee] = {}
+        self._by_skill = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def json_bytes(self) -> bytes:
+        """The full employee list, already serialized."""
+        return self.payload.tobytes()
+
+    def get_json(self, employee_id: int) -> Optional[bytes]:
+        i = bisect.bisect_left(self.ids, employee_id)
+        if i == len(self.ids) or self.ids[i] != employee_id:
+            return None
+        start = self.offsets[i]
+        return self.payload[start:start + self.lengths[i]].tobytes()
+
+    def get(self, employee_id: int) -> Optional[Employee]:
+        """One employee, decoded on first access and then kept for this snapshot version."""
+        employee = self._decoded.get(employee_id)
+        if employee is None:
+            raw = self.get_json(employee_id)
+            if raw is None:
+                return None
+            employee = self._decoded.setdefault(employee_id, Employee.model_validate_json(raw))
+        return employee
+
+    def employees(self) -> List[Employee]:
+        """
+        Decoded Employee models, built once per snapshot version in this
+        worker. Only for callers that need every employee (AI search, filters
+        without a skill); this copy is per worker, unlike the mapping.
+        """
+        if self._employees is None:
+            with self._lock:
+                if self._employees is None:
+                    pydantic = lazy_import("pydantic")
+                    adapter = pydantic.TypeAdapter(List[Employee])
+                    employees = adapter.validate_json(self.payload.tobytes())
+                    # Same objects as `get` hands out
+                    self._employees = [self._decoded.setdefault(e.id, e) for e in employees]
+        return self._employees
+
+    def by_skill(self) -> Dict[str, array]:
+        """
+        Ids per canonical skill (ascending), built once per snapshot version in
+        this worker. Holds ids only: the records stay in the mapping (`get`).
+        """
+        if self._by_skill is None:
+            with self._lock:
+                if self._by_skill is None:
+                    index = {}
+                    for i in range(len(self.ids)):
+                        start = self.offsets[i]
+                        record = json.loads(self.payload[start:start + self.lengths[i]].tobytes())
+                        for skill in set(SKILLS.canonical(s) for s in record["skills"]):
+                            SKILLS.add(skill)
+                            index.setdefault(skill, array("q")).append(self.ids[i])
+                    self._by_skill = index
+        return self._by_skill
+
+
+def write_snapshot(path: str, employees: List[Employee]):
+    """Serialize employees (sorted by id) into the snapshot format at `path`."""
+    employees = sorted(employees, key=lambda e: e.id)
+    records = [e.model_dump_json().encode() for e in employees]
+
+    offsets = []
+    pos = 1  # after "["
+    for rec in records:
+        offsets.append(pos)
+        pos += len(rec) + 1  # record + "," (or the closing "]")
+    payload = b"[" + b",".join(records) + b"]"
+
+    count = len(records)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, count, len(payload)))
+        f.write(struct.pack(f"<{count}q", *(e.id for e in employees)))
+        f.write(struct.pack(f"<{count}Q", *offsets))
+        f.write(struct.pack(f"<{count}I", *(len(r) for r in records)))
+        f.write(payload)
+
+
+class EmployeeStore(SnapshotStore):
+    """
+    Per-worker handle on the shared employee snapshot. Rebuilt from Postgres
+    when the employees table changes; the mock employees are served when the
+    table does not exist.
+    """
+
+    name = "employees"
+    suffix = ".snap"
+
+    def start_refresher(self, interval: float = REFRESH_INTERVAL):
+        super().start_refresher(interval)
+
+    def source_fingerprint(self) -> Optional[str]:
+        errors = lazy_import("psycopg2.errors")
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            try:
+                # Row count plus the newest row version, as for demands: any
+                # insert/update raises max(xmin), deletes change the count
+                cur.execute("SELECT count(*), max(xmin::text::bigint) FROM employees")
+            except errors.UndefinedTable:
+                return None
+            count, newest = cur.fetchone()
+            cur.close()
+            return f"{count}:{newest}"
+        finally:
+            release_connection(conn)
+
+    def load_source(self) -> List[Employee]:
+        extras = lazy_import("psycopg2.extras")
+        conn = get_connection()
+        try:
+            cur = conn.cursor(cursor_factory=extras.RealDictCursor)
+            cur.execute("SELECT * FROM employees ORDER BY id")
+            rows = decode_rows(cur.fetchall())
+            cur.close()
+        finally:
+            release_connection(conn)
+
+        employees = []
+        for r in rows:
+            try:
+                employees.append(employee_from_row(r))
+            except Exception:
+                # Skip invalid rows
+                continue
+        return employees
+
+    def fallback_source(self) -> List[Employee]:
+        return list(mock_employees)
+
+    def write(self, path: str, employees: List[Employee]):
+        write_snapshot(path, employees)
+        return {"count": len(employees)}
+
+    def open(self, path: str, meta: dict) -> EmployeeSnapshot:
+        return EmployeeSnapshot(path, meta)
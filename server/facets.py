@@ -0,0 +1,367 @@
+"""
+Faceted search over employees and demands.
+
+`FacetIndex` keeps one bitmap (a Python int, bit i = record in slot i) per
+value of every facet field. Filtering ANDs the union of the selected values'
+bitmaps per field, and each facet count is one `(bitmap & selection)
+.bit_count()`, so a search with counts touches (values x records / 64) machine
+words instead of the records themselves.
+
+Facet counts follow the usual multi-select convention: the counts of a field
+are taken with every filter applied except that field's own, so the UI can
+show how many records each alternative value would give.
+
+`SyncedFacets` keeps an index current from the delta-sync API (sync.py): the
+first search builds it from a full sync, later searches apply the rows
+changed / deleted since the last watermark (at most every
+FACET_SYNC_INTERVAL seconds) by rewriting only those records' bits. Slots
+stay in id order: a new id that sorts before existing ones, or too many
+deleted slots, rebuilds the index from its live records.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from db import get_connection, release_connection
+from startup import lazy_import
+from sync import SyncSchemaError, changes_since, sync_ready
+
+# Seconds a search may serve an index before checking the table for changes
+FACET_SYNC_INTERVAL = float(os.getenv("FACET_SYNC_INTERVAL", "1"))
+
+# Largest page a search returns
+MAX_PAGE_SIZE = 500
+
+# Bitmap bytes decoded at a time when collecting a page
+PAGE_BLOCK_BYTES = 1024
+
+# Deleted slots tolerated (and at least this share of all slots) before a
+# synced index is rebuilt without them
+COMPACT_MIN_FREE = 1024
+COMPACT_FREE_RATIO = 0.25
+
+# Set bits per byte value (built on first use)
+_popcount = None
+
+
+def _id_order(key):
+    # decode_rows turns numeric text ids into ints ("1" -> 1) and leaves
+    # others ("DEM-...") as strings: numbers first, in numeric order
+    if isinstance(key, (int, float)) and not isinstance(key, bool):
+        return (0, key, "")
+    return (1, 0, str(key))
+
+
+def _values(value) -> List[str]:
+    # Facet values of a field (lists are multi-valued, e.g. skills)
+    if value is None or value == "":
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(v) for v in value if v is not None and v != ""]
+    return [str(value)]
+
+
+class FacetIndex:
+    """
+    Bitmap index over records keyed by id. Slots follow insertion order (new
+    records are appended, deleted slots stay empty until `rebuilt()`), and
+    pages are returned in slot order, or reversed with `descending`.
+    """
+
+    def __init__(self, fields: List[str], descending: bool = False):
+        self.fields = fields
+        self.descending = descending
+        self.bitmaps: Dict[str, Dict[str, int]] = {f: {} for f in fields}
+        self.alive = 0
+        self.records: List[Optional[dict]] = []
+        self.keys: List = []
+        self.slots: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def free(self) -> int:
+        """Slots left empty by deleted records."""
+        return len(self.records) - len(self.slots)
+
+    def rebuilt(self, order: Callable) -> "FacetIndex":
+        """A new index of the live records, slots sorted by `order(key)`."""
+        items = sorted(
+            ((key, record) for key, record in zip(self.keys, self.records) if record is not None),
+            key=lambda item: order(item[0]),
+        )
+        index = FacetIndex(self.fields, descending=self.descending)
+        index.load(items)
+        return index
+
+    def _set(self, slot: int, record: dict):
+        bit = 1 << slot
+        for field in self.fields:
+            bitmaps = self.bitmaps[field]
+            for value in _values(record.get(field)):
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def _clear(self, slot: int, record: dict):
+        bit = 1 << slot
+        for field in self.fields:
+            bitmaps = self.bitmaps[field]
+            for value in _values(record.get(field)):
+                remaining = bitmaps.get(value, 0) & ~bit
+                if remaining:
+                    bitmaps[value] = remaining
+                else:
+                    bitmaps.pop(value, None)
+
+    def load(self, items: List[tuple]):
+        """Bulk build from (key, record) pairs into an empty index: one bitmap per value, built once."""
+        np = lazy_import("numpy")
+        members: Dict[str, Dict[str, List[int]]] = {f: {} for f in self.fields}
+        for slot, (key, record) in enumerate(items):
+            self.slots[str(key)] = slot
+            self.keys.append(key)
+            self.records.append(record)
+            for field in self.fields:
+                for value in _values(record.get(field)):
+                    members[field].setdefault(value, []).append(slot)
+
+        def bitmap(slots):
+            bits = np.zeros(len(items), dtype=np.uint8)
+            bits[slots] = 1
+            return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+        for field, values in members.items():
+            self.bitmaps[field] = {value: bitmap(slots) for value, slots in values.items()}
+        self.alive = (1 << len(items)) - 1
+
+    def upsert(self, key, record: dict):
+        slot = self.slots.get(str(key))
+        if slot is None:
+            slot = len(self.records)
+            self.records.append(None)
+            self.keys.append(key)
+            self.slots[str(key)] = slot
+            self.alive |= 1 << slot
+        else:
+            self._clear(slot, self.records[slot])
+        self.records[slot] = record
+        self._set(slot, record)
+
+    def remove(self, key):
+        slot = self.slots.pop(str(key), None)
+        if slot is None:
+            return
+        self._clear(slot, self.records[slot])
+        self.records[slot] = None
+        self.keys[slot] = None
+        self.alive &= ~(1 << slot)
+
+    def values(self, field: str) -> List[str]:
+        """Distinct values currently indexed for `field`."""
+        return list(self.bitmaps[field])
+
+    def _matching(self, field: str, wanted: Iterable[str], contains: bool = False) -> int:
+        wanted = [w.lower() for w in wanted if w]
+        bitmap = 0
+        for value, bits in self.bitmaps[field].items():
+            v = value.lower()
+            if any((w in v) if contains else (w == v) for w in wanted):
+                bitmap |= bits
+        return bitmap
+
+    def _page(self, bitmap: int, start: int, stop: int) -> List[int]:
+        # Slots of set bits start..stop in page order, reading the bitmap's
+        # bytes one block at a time and skipping blocks by popcount
+        np = lazy_import("numpy")
+        global _popcount
+        if _popcount is None:
+            _popcount = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+        raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+        blocks = range(0, len(raw), PAGE_BLOCK_BYTES)
+        slots = []
+        skip = start
+        for base in (reversed(blocks) if self.descending else blocks):
+            block = raw[base:base + PAGE_BLOCK_BYTES]
+            count = int(_popcount[block].sum())
+            if count <= skip:
+                skip -= count
+                continue
+            found = np.flatnonzero(np.unpackbits(block, bitorder="little")) + base * 8
+            if self.descending:
+                found = found[::-1]
+            slots.extend(found[skip:skip + stop - start - len(slots)].tolist())
+            skip = 0
+            if len(slots) >= stop - start:
+                break
+        return slots
+
+    def search(
+        self,
+        filters: Dict[str, List[str]],
+        contains: Iterable[str] = (),
+        offset: int = 0,
+        limit: int = 20,
+    ) -> dict:
+        """
+        Records matching every filter ({field: [values]}, any value per field,
+        case-insensitive; substring match for fields in `contains`), one page
+        of them and the facet counts.
+        """
+        contains = set(contains)
+        selected = {
+            field: self._matching(field, values, field in contains)
+            for field, values in filters.items()
+            if values
+        }
+
+        matches = self.alive
+        for bitmap in selected.values():
+            matches &= bitmap
+
+        facets = {}
+        for field in self.fields:
+            base = self.alive
+            for other, bitmap in selected.items():
+                if other != field:
+                    base &= bitmap
+            counts = {}
+            for value, bits in self.bitmaps[field].items():
+                n = (bits & base).bit_count()
+                if n:
+                    counts[value] = n
+            facets[field] = dict(sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])))
+
+        total = matches.bit_count()
+        page = []
+        if offset < total:
+            page = [self.records[s] for s in self._page(matches, offset, offset + limit)]
+
+        return {"total": total, "offset": offset, "limit": limit, "items": page, "facets": facets}
+
+
+class SyncedFacets:
+    """
+    A FacetIndex over a table tracked by sync.py, kept current with delta
+    syncs. `to_record` maps a table row to the record returned in pages (None,
+    or an exception, skips the row); `fallback` supplies records when the
+    table doesn't exist or has no sync schema yet, and is only called again
+    when `fallback_version` changes.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        fields: List[str],
+        to_record: Callable[[dict], Optional[dict]],
+        descending: bool = False,
+        fallback: Optional[Callable[[], List[dict]]] = None,
+        fallback_version: Optional[Callable[[], object]] = None,
+    ):
+        self.table = table
+        self.fields = fields
+        self.to_record = to_record
+        self.descending = descending
+        self.fallback = fallback
+        self.fallback_version = fallback_version
+        self.index = None
+        self.watermark = None
+        self.checked = 0.0
+        self._built_from = None
+        self._tail = None
+        self._lock = threading.Lock()
+
+    def _record(self, row: dict) -> Optional[dict]:
+        try:
+            return self.to_record(row)
+        except Exception:
+            # Invalid row: left out of the index, like the snapshot does
+            return None
+
+    def _load(self, items: List[tuple]):
+        # items in id order
+        index = FacetIndex(self.fields, descending=self.descending)
+        index.load(items)
+        self.index = index
+        self._tail = _id_order(items[-1][0]) if items else None
+
+    def _apply(self, changes: dict):
+        # Slots in id order, so pages come back in id order
+        rows = sorted(changes["changed"], key=lambda r: _id_order(r["id"]))
+        if changes["full"]:
+            records = ((row["id"], self._record(row)) for row in rows)
+            self._load([(key, record) for key, record in records if record is not None])
+        else:
+            index = self.index
+            out_of_order = False
+            for key in changes["deleted"]:
+                index.remove(key)
+            for row in rows:
+                key = row["id"]
+                record = self._record(row)
+                if record is None:
+                    index.remove(key)
+                    continue
+                if str(key) not in index.slots:
+                    # Appended: still in id order unless it sorts before the last slot
+                    order = _id_order(key)
+                    if self._tail is not None and order < self._tail:
+                        out_of_order = True
+                    else:
+                        self._tail = order
+                index.upsert(key, record)
+            if out_of_order or index.free > max(COMPACT_MIN_FREE, len(index.records) * COMPACT_FREE_RATIO):
+                index = self.index = index.rebuilt(_id_order)
+                self._tail = _id_order(index.keys[-1]) if index.keys else None
+        self.watermark = changes["watermark"]
+
+    def _sync(self):
+        conn = get_connection()
+        try:
+            try:
+                ready = sync_ready(conn, self.table)
+            except SyncSchemaError:
+                # Legacy table not migrated yet (see sync.py)
+                if self.fallback is None:
+                    raise
+                ready = False
+            if not ready:
+                if self.fallback is None:
+                    raise LookupError(f"Table '{self.table}' does not exist")
+                self._load_fallback()
+                return
+            self._built_from = None
+            self._apply(changes_since(conn, self.table, self.watermark))
+        finally:
+            release_connection(conn)
+
+    def _load_fallback(self):
+        version = self.fallback_version() if self.fallback_version is not None else None
+        if version is not None and self.index is not None and self._built_from == version:
+            return
+        records = sorted(self.fallback(), key=lambda r: _id_order(r["id"]))
+        self._load([(record["id"], record) for record in records])
+        self.watermark = None
+        self._built_from = version
+
+    def current(self) -> FacetIndex:
+        """The index, brought up to date if it was last checked over FACET_SYNC_INTERVAL ago."""
+        now = time.monotonic()
+        if self.index is not None and now - self.checked < FACET_SYNC_INTERVAL:
+            return self.index
+        with self._lock:
+            if self.index is None or time.monotonic() - self.checked >= FACET_SYNC_INTERVAL:
+                self._sync()
+                self.checked = time.monotonic()
+            return self.index
+
+    def values(self, field: str) -> List[str]:
+        """Distinct values currently indexed for `field`."""
+        index = self.current()
+        with self._lock:
+            return index.values(field)
+
+    def search(self, filters: Dict[str, List[str]], contains: Iterable[str] = (), offset: int = 0, limit: int = 20) -> dict:
+        index = self.current()
+        with self._lock:
+            return index.search(filters, contains=contains, offset=offset, limit=min(limit, MAX_PAGE_SIZE))
@@ -0,0 +1,583 @@
+"""
+Typed ingest stage for `/upload-excel`.
+
+Spreadsheet exports carry dates, timestamps, months, numbers and Y/N flags as
+text. `infer_types` recognizes them column by column with explicit formats
+(one vectorized parse per format over the distinct values, no per-cell
+guessing) and returns the typed frame plus the Postgres type of every column,
+so new tables get DATE, TIMESTAMP, numeric and BOOLEAN columns instead of TEXT.
+
+A text column is converted only if every non-empty value parses; otherwise it
+stays TEXT unchanged.
+
+Batch uploads (`/upload-batch`) split workbooks into sheets and zip archives
+into files, parse the parts in a process pool and load them concurrently, one
+pooled connection per target table.
+"""
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from change_feed import notify_changes
+from db import get_connection, release_connection
+from startup import lazy_import
+from sync import TRACKED, SyncSchemaError, ensure_sync_schema, forget_schema
+
+# Processes parsing sheets / files of a batch upload (default: one per CPU)
+PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+# Tables of a batch loaded at the same time, each over its own pooled connection
+LOAD_WORKERS = int(os.getenv("INGEST_LOAD_WORKERS", "4"))
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls")
+
+# Formats are tried in order and each value takes the first one that parses
+# it. The export is month-first with either separator (MM-DD-YYYY when the
+# day is at most 12, M/D/YYYY otherwise); a column whose dash dates can only
+# be day-first is parsed as DD-MM-YYYY instead (see dash_day_first).
+TIMESTAMP_FORMATS = ["%m-%d-%Y %H:%M", "%m/%d/%Y %H:%M", "%Y-%m-%d %H:%M:%S", "%m-%d-%Y %H:%M:%S"]
+DATE_FORMATS = ["%m-%d-%Y", "%m/%d/%Y", "%Y-%m-%d"]
+# "25-Mar" -> 2025-03-01
+MONTH_FORMATS = ["%y-%b"]
+
+TRUE_VALUES = {"true", "yes", "y"}
+FALSE_VALUES = {"false", "no", "n"}
+
+INT32_MIN, INT32_MAX = -(2 ** 31), 2 ** 31 - 1
+
+# information_schema.columns.data_type values bound as plain strings
+TEXT_TYPES = {"text", "character varying", "character"}
+
+
+def normalize_upload_frame(df):
+    """Normalize uploaded column names (spaces -> underscores, lowercase)."""
+    df.columns = [c.replace(" ", "_").lower() for c in df.columns]
+    return df
+
+
+def read_frame(filename: str, data: bytes, sheet=None):
+    """Read one CSV file or one workbook sheet (the first by default)."""
+    pd = lazy_import("pandas")
+    if filename.lower().endswith(".csv"):
+        return pd.read_csv(BytesIO(data))
+    return pd.read_excel(BytesIO(data), sheet_name=sheet if sheet is not None else 0)
+
+
+def _text(series):
+    """Stripped string view of a column with blanks as missing."""
+    pd = lazy_import("pandas")
+    text = series.astype("string").str.strip()
+    return text.mask(text == "", pd.NA)
+
+
+def parse_with_formats(text, formats: List[str]):
+    """
+    Parse a string column with explicit formats.
+    Returns (datetime64 series, mask of present values no format could parse).
+    """
+    pd = lazy_import("pandas")
+    parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[us]")
+    remaining = text.notna().to_numpy(dtype=bool, copy=True)
+    for fmt in formats:
+        if not remaining.any():
+            break
+        attempt = pd.to_datetime(text[remaining], format=fmt, errors="coerce")
+        parsed[remaining] = attempt
+        remaining = remaining & parsed.isna().to_numpy()
+    return parsed, remaining
+
+
+def dash_day_first(text) -> bool:
+    """True when a column's dash dates have a leading part above 12 and none in the middle."""
+    pd = lazy_import("pandas")
+    parts = text.str.extract(r"^(\d{1,2})-(\d{1,2})-\d{4}")
+    first = pd.to_numeric(parts[0], errors="coerce")
+    second = pd.to_numeric(parts[1], errors="coerce")
+    return bool((first > 12).any() and not (second > 12).any())
+
+
+def _day_first(formats: List[str]) -> List[str]:
+    return [f.replace("%m-%d-%Y", "%d-%m-%Y") for f in formats]
+
+
+def _integer_type(values) -> str:
+    if len(values) and (values.min() < INT32_MIN or values.max() > INT32_MAX):
+        return "BIGINT"
+    return "INTEGER"
+
+
+def _expand(unique_values, codes, index):
+    """Map per-distinct-value results back onto the rows (code -1 -> missing)."""
+    pd = lazy_import("pandas")
+    values = pd.api.extensions.take(unique_values.array, codes, allow_fill=True)
+    return pd.Series(values, index=index)
+
+
+def infer_column(series) -> Tuple[object, str]:
+    """(typed series, Postgres type) for one uploaded column."""
+    pd = lazy_import("pandas")
+    api = pd.api.types
+
+    # Columns pandas already typed
+    if api.is_bool_dtype(series):
+        return series, "BOOLEAN"
+    if api.is_integer_dtype(series):
+        return series, _integer_type(series.dropna())
+    if api.is_float_dtype(series):
+        return series, "FLOAT"
+    if api.is_datetime64_any_dtype(series):
+        return series, "TIMESTAMP"
+
+    # Text: inspect and parse each distinct value once, then expand
+    codes, uniques = pd.factorize(series)
+    text = _text(pd.Series(uniques, dtype=object))
+    present = text.notna()
+    if not present.any():
+        return series, "TEXT"
+    values = text[present]
+
+    # Booleans
+    lowered = values.str.lower()
+    if lowered.isin(TRUE_VALUES | FALSE_VALUES).all():
+        flags = pd.Series(pd.NA, index=text.index, dtype="boolean")
+        flags[present] = lowered.isin(TRUE_VALUES)
+        return _expand(flags, codes, series.index), "BOOLEAN"
+
+    # Numbers, dates and months all start with a digit (or sign / point)
+    if not values.str.match(r"^[+-.]?\d").all():
+        return series, "TEXT"
+
+    # Numbers (codes with leading zeros stay text)
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.notna().all() and not values.str.match(r"^[+-]?0\d").any():
+        numbers = numbers.astype("float64")
+        if (numbers == numbers.round()).all() and numbers.abs().max() < 2 ** 53:
+            typed = pd.Series(pd.NA, index=text.index, dtype="Int64")
+            typed[present] = numbers.astype("int64")
+            typed = _expand(typed, codes, series.index)
+            return typed, _integer_type(typed.dropna())
+        typed = pd.Series(float("nan"), index=text.index, dtype="float64")
+        typed[present] = numbers
+        return _expand(typed, codes, series.index), "FLOAT"
+
+    # Dates and timestamps; a column may mix both (e.g. fulfillmentDate).
+    # Values with a time part only try the timestamp formats and vice versa.
+    timed = text.str.contains(":", regex=False).fillna(False).to_numpy(dtype=bool)
+    date_formats, timestamp_formats = DATE_FORMATS, TIMESTAMP_FORMATS
+    if dash_day_first(values):
+        date_formats, timestamp_formats = _day_first(DATE_FORMATS), _day_first(TIMESTAMP_FORMATS)
+    dates, bad_dates = parse_with_formats(text.mask(timed), date_formats)
+    stamps, bad_stamps = parse_with_formats(text.where(timed), timestamp_formats)
+    if not (bad_dates | bad_stamps).any():
+        parsed = dates.where(~timed, stamps)
+        return _expand(parsed, codes, series.index), "TIMESTAMP" if timed.any() else "DATE"
+
+    parsed, unparsed = parse_with_formats(text, MONTH_FORMATS)
+    if not unparsed.any():
+        return _expand(parsed, codes, series.index), "DATE"
+
+    return series, "TEXT"
+
+
+def infer_types(df) -> Tuple[object, Dict[str, str]]:
+    """Typed copy of an uploaded frame and {column: Postgres type}."""
+    pd = lazy_import("pandas")
+    typed = {}
+    sql_types = {}
+    for col in df.columns:
+        typed[col], sql_types[col] = infer_column(df[col])
+    return pd.DataFrame(typed, index=df.index), sql_types
+
+
+def align_to_table(raw, typed, sql_types: Dict[str, str], existing: Optional[Dict[str, str]]):
+    """
+    Pick per column what gets bound when loading into an existing table:
+    text columns keep the uploaded strings as-is, typed columns get the
+    converted values. `existing` maps column -> information_schema data_type
+    (None for a table about to be created from `sql_types`).
+    """
+    if not existing:
+        return typed
+    frame = typed.copy()
+    for col in typed.columns:
+        if sql_types[col] != "TEXT" and existing.get(col) in TEXT_TYPES:
+            frame[col] = raw[col]
+    return frame
+
+
+def frame_rows(df, sql_types: Optional[Dict[str, str]] = None) -> List[tuple]:
+    """
+    Rows of a frame as tuples of plain Python values ready to bind:
+    missing values become None and DATE columns become `date`s.
+    """
+    pd = lazy_import("pandas")
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if sql_types and sql_types.get(col) == "DATE" and pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.date
+        values = series.astype(object)
+        columns[col] = values.where(series.notna(), None).tolist()
+    return list(zip(*columns.values())) if columns else []
+
+
+# ============================================
+# LOADING
+# ============================================
+def execute_rows(cur, insert_sql, rows: List[tuple], savepoints: bool = False) -> dict:
+    """
+    Run the insert / upsert once per row: {"inserted": [keys], "updated":
+    [keys], "unchanged", "failed", "first_error"}. Without `savepoints` the
+    first bad row raises and leaves the transaction aborted; with them each
+    row runs under a savepoint and bad rows are rolled back alone and counted.
+    """
+    result = {"inserted": [], "updated": [], "unchanged": 0, "failed": 0, "first_error": None}
+
+    def row_failed(e):
+        result["failed"] += 1
+        result["first_error"] = result["first_error"] or str(e).strip()
+
+    # Releasing the previous savepoint in the same round trip keeps one
+    # subtransaction open at a time
+    prefix = b"SAVEPOINT upload_row; " if savepoints else b""
+    for row in rows:
+        if not savepoints:
+            cur.execute(insert_sql, row)
+        else:
+            try:
+                statement = cur.mogrify(insert_sql, row)
+            except Exception as e:
+                row_failed(e)
+                continue
+            try:
+                sent, prefix = prefix, b"RELEASE SAVEPOINT upload_row; SAVEPOINT upload_row; "
+                cur.execute(sent + statement)
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT upload_row;")
+                row_failed(e)
+                continue
+        returned = cur.fetchone()
+        if returned is None:
+            result["unchanged"] += 1
+            continue
+        key, was_inserted = returned
+        result["inserted" if was_inserted else "updated"].append(key)
+    return result
+
+
+def load_frame(table_name: str, df, typed=None, column_types: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Create `table_name` from the frame's inferred types if it does not exist,
+    then upsert every row (on the first of id / rolecode / project_id present).
+    Returns the debug log `/upload-excel` reports.
+    """
+    sql = lazy_import("psycopg2.sql")
+    if typed is None:
+        typed, column_types = infer_types(df)
+
+    tracked = table_name.lower() in TRACKED
+    change_column = TRACKED[table_name.lower()][0] if tracked else None
+
+    debug_log = {}
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+
+        # Check table existence
+        cur.execute("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.tables
+                WHERE table_name = %s
+            );
+        """, (table_name.lower(),))
+        table_exists = cur.fetchone()[0]
+
+        debug_log["table_exists"] = table_exists
+
+        existing_types = None
+        if table_exists:
+            cur.execute("""
+                SELECT column_name, data_type
+                FROM information_schema.columns
+                WHERE table_name = %s;
+            """, (table_name.lower(),))
+            existing_types = dict(cur.fetchall())
+
+        # Auto-detect unique key for UPSERT
+        preferred_keys = ["id", "rolecode", "project_id"]
+
+        upsert_key = None
+        for key in preferred_keys:
+            if key in df.columns:
+                upsert_key = key
+                break
+
+        debug_log["upsert_key"] = upsert_key
+
+        # If table does not exist → create table with SERIAL id if missing
+        if not table_exists:
+            debug_log["action"] = "creating_new_table"
+
+            # The change column of synced tables is added by ensure_sync_schema
+            column_defs = [f'"{col}" {column_types[col]}' for col in df.columns if col != change_column]
+
+            # If Excel doesn't include id, add SERIAL id
+            if "id" not in df.columns:
+                create_table_sql = f"""
+                    CREATE TABLE "{table_name}" (
+                        internal_id SERIAL PRIMARY KEY,
+                        {", ".join(column_defs)}
+                    );
+                """
+            else:
+                # Use Excel id as primary key
+                create_table_sql = f"""
+                    CREATE TABLE "{table_name}" (
+                        {", ".join(column_defs)},
+                        PRIMARY KEY (id)
+                    );
+                """
+
+            debug_log["create_table_sql"] = create_table_sql
+            cur.execute(create_table_sql)
+            conn.commit()
+            if tracked:
+                forget_schema(table_name.lower())
+
+        else:
+            debug_log["action"] = "upsert_into_existing_table"
+
+        # Change column, index and triggers before the first row goes in. A
+        # table that needs its data converted first loads without them.
+        if tracked:
+            try:
+                ensure_sync_schema(conn, table_name.lower())
+            except SyncSchemaError as e:
+                debug_log["sync_schema_error"] = str(e)
+                # No trigger writes the change column: keep the uploaded values
+                change_column = None
+
+        # Otherwise the trigger writes it, uploaded values are ignored
+        if change_column in df.columns:
+            df = df.drop(columns=[change_column])
+            typed = typed.drop(columns=[change_column])
+
+        cols = df.columns.tolist()
+
+        # Every statement reports its key and whether it inserted (xmax = 0)
+        # or updated an existing row
+        returning = sql.SQL("RETURNING {key}, (xmax = 0)").format(
+            key=sql.Identifier(upsert_key) if upsert_key else sql.SQL("NULL")
+        )
+
+        update_cols = [col for col in cols if col != upsert_key]
+
+        if upsert_key and update_cols:
+            # UPSERT query; rows whose values did not change are left alone
+            # (no new row version, no change column bump, no RETURNING row)
+            insert_sql = sql.SQL("""
+                INSERT INTO {table} ({fields})
+                VALUES ({values})
+                ON CONFLICT ({key})
+                DO UPDATE SET
+                {updates}
+                WHERE ({current}) IS DISTINCT FROM ({excluded})
+                {returning}
+            """).format(
+                table=sql.Identifier(table_name),
+                fields=sql.SQL(", ").join(map(sql.Identifier, cols)),
+                values=sql.SQL(", ").join(sql.Placeholder() * len(cols)),
+                key=sql.Identifier(upsert_key),
+                updates=sql.SQL(", ").join(
+                    sql.SQL(f"{col} = EXCLUDED.{col}") for col in update_cols
+                ),
+                current=sql.SQL(", ").join(
+                    sql.SQL("{}.{}").format(sql.Identifier(table_name), sql.Identifier(col)) for col in update_cols
+                ),
+                excluded=sql.SQL(", ").join(
+                    sql.SQL("EXCLUDED.{}").format(sql.Identifier(col)) for col in update_cols
+                ),
+                returning=returning,
+            )
+        elif upsert_key:
+            insert_sql = sql.SQL("""
+                INSERT INTO {table} ({fields})
+                VALUES ({values})
+                ON CONFLICT ({key}) DO NOTHING
+                {returning}
+            """).format(
+                table=sql.Identifier(table_name),
+                fields=sql.SQL(", ").join(map(sql.Identifier, cols)),
+                values=sql.SQL(", ").join(sql.Placeholder() * len(cols)),
+                key=sql.Identifier(upsert_key),
+                returning=returning,
+            )
+        else:
+            # Insert only
+            insert_sql = sql.SQL("""
+                INSERT INTO {table} ({fields})
+                VALUES ({values})
+                {returning}
+            """).format(
+                table=sql.Identifier(table_name),
+                fields=sql.SQL(", ").join(map(sql.Identifier, cols)),
+                values=sql.SQL(", ").join(sql.Placeholder() * len(cols)),
+                returning=returning,
+            )
+
+        # Typed values for typed columns, the uploaded text for TEXT columns
+        rows = frame_rows(align_to_table(df, typed, column_types, existing_types), column_types)
+
+        try:
+            result = execute_rows(cur, insert_sql, rows)
+        except Exception:
+            # A bad row aborted the transaction (only the rows are uncommitted
+            # here): load them again, skipping the bad ones
+            conn.rollback()
+            result = execute_rows(cur, insert_sql, rows, savepoints=True)
+        inserted_ids, updated_ids = result["inserted"], result["updated"]
+
+        # Live change feed (see change_feed.py); row deltas are delivered on
+        # commit, anything else is left to the caller to announce as a resync
+        # once the demands snapshot is republished
+        if table_name.lower() == "demands" and (inserted_ids or updated_ids):
+            if upsert_key != "id" or not notify_changes(cur, inserted_ids, updated_ids):
+                debug_log["resync"] = True
+
+        conn.commit()
+        cur.close()
+
+        debug_log["inserted"] = len(inserted_ids)
+        debug_log["updated"] = len(updated_ids)
+        debug_log["unchanged"] = result["unchanged"]
+        debug_log["failed"] = result["failed"]
+        if result["first_error"]:
+            debug_log["first_error"] = result["first_error"]
+    finally:
+        release_connection(conn)
+
+    return debug_log
+
+
+# ============================================
+# BATCH UPLOADS
+# ============================================
+_parse_pool = None
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for parsing batch parts, started on first use. Workers are
+    spawned (not forked) so they don't inherit the server's threads and sockets.
+    """
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _parse_pool
+
+
+def close_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(cancel_futures=True)
+        _parse_pool = None
+
+
+def table_name_for(name: str) -> str:
+    """Table name for a sheet / file name: "Q3 Demands.csv" -> "q3_demands"."""
+    stem = os.path.splitext(os.path.basename(name))[0] if "." in name else name
+    return re.sub(r"[^0-9a-z_]+", "_", stem.lower()).strip("_") or "upload"
+
+
+def split_parts(files: List[Tuple[str, bytes]], table_map: Optional[Dict[str, str]] = None) -> List[dict]:
+    """
+    Expand uploaded files into parts: every sheet of a workbook, every CSV,
+    and the CSVs / workbooks inside zip archives. A part goes to the table
+    named after its sheet (workbooks) or file (CSVs) unless `table_map` maps
+    the part name ("book.xlsx:Sheet1", "pack.zip/q3.csv") or that sheet / file
+    name to another table.
+    """
+    pd = lazy_import("pandas")
+    table_map = table_map or {}
+    parts = []
+
+    def add(name, filename, data, sheet=None):
+        label = sheet if sheet is not None else os.path.basename(filename)
+        table = table_map.get(name) or table_map.get(label) or table_name_for(label)
+        parts.append({"name": name, "filename": filename, "data": data, "sheet": sheet, "table": table})
+
+    def expand(name, filename, data):
+        lower = filename.lower()
+        if lower.endswith(".zip"):
+            with zipfile.ZipFile(BytesIO(data)) as archive:
+                for info in archive.infolist():
+                    if info.is_dir() or os.path.basename(info.filename).startswith((".", "~$")):
+                        continue
+                    expand(f"{name}/{info.filename}", info.filename, archive.read(info))
+        elif lower.endswith(".csv"):
+            add(name, filename, data)
+        elif lower.endswith(EXCEL_SUFFIXES):
+            # Only the workbook structure is read here; sheets are parsed in the pool
+            with pd.ExcelFile(BytesIO(data)) as book:
+                sheets = book.sheet_names
+            for sheet in sheets:
+                add(f"{name}:{sheet}", filename, data, sheet)
+
+    for filename, data in files:
+        expand(filename, filename, data)
+    return parts
+
+
+def parse_part(filename: str, data: bytes, sheet=None):
+    """Read, normalize and type one part. Runs in a parse worker process."""
+    df = read_frame(filename, data, sheet)
+    if df.empty:
+        raise ValueError("Sheet is empty" if sheet is not None else "File is empty")
+    df = normalize_upload_frame(df)
+    typed, column_types = infer_types(df)
+    return df, typed, column_types
+
+
+def ingest_batch(parts: List[dict]) -> List[dict]:
+    """
+    Parse all parts in the process pool and load them as they finish. Parts
+    for the same table are loaded one after another in upload order (the
+    first one may create the table); different tables load concurrently.
+    Returns one result per part, in the order of `parts`.
+    """
+    pool = get_parse_pool()
+    futures = [pool.submit(parse_part, p["filename"], p["data"], p["sheet"]) for p in parts]
+
+    by_table = {}
+    for i, part in enumerate(parts):
+        by_table.setdefault(part["table"], []).append(i)
+
+    results = [None] * len(parts)
+
+    def load_table(indexes):
+        for i in indexes:
+            part = parts[i]
+            result = {"part": part["name"], "table": part["table"]}
+            try:
+                df, typed, column_types = futures[i].result()
+                result["rows"] = len(df)
+                result["column_types"] = column_types
+                result.update(load_frame(part["table"], df, typed, column_types))
+                if result["failed"]:
+                    result["status"] = "failed"
+                    result["error"] = f"{result['failed']} of {len(df)} rows could not be loaded: {result['first_error']}"
+                else:
+                    result["status"] = "loaded"
+            except Exception as e:
+                result["status"] = "failed"
+                result["error"] = str(e)
+            results[i] = result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(LOAD_WORKERS, len(by_table)))) as loaders:
+        list(loaders.map(load_table, by_table.values()))
+    return results
@@ -1,21 +1,80 @@
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-from io import BytesIO
 import json
-import numpy as np
-import pandas as pd
 from models import Employee
-from data import mock_employees
 from dotenv import load_dotenv
-from ai_agent import get_ai_agent_recommendation, generate_sql_from_task
-from db import execute_read_query, get_connection
-import psycopg2
-from psycopg2 import sql
+from employee_store import EmployeeStore, employee_from_row
+from demand_snapshot import DemandSnapshotStore, json_default
+from change_feed import ChangeFeed, announce_resync
+from sync import sync_ready, changes_since, migrate as migrate_sync_schema
+from facets import SyncedFacets, MAX_PAGE_SIZE
+from skills import SKILLS, ROLES
+from request_log import traced, stage
+from ingest import (
+    normalize_upload_frame, read_frame, infer_types, load_frame, split_parts, ingest_batch, close_parse_pool,
+    parse_with_formats, DATE_FORMATS, TIMESTAMP_FORMATS,
+)
+from db import execute_read_query, get_connection, release_connection, warm_pool, close_pool
+from startup import lazy_import, timed, record_since, startup_report
+
+# pandas, numpy, psycopg2 and ai_agent (google.generativeai) are imported on
+# first use via lazy_import() so worker boot and health checks don't pay for them.
 
 load_dotenv()
 
-app = FastAPI(title="Dynamic Demand Dashboard")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the connection pool and in-memory indexes before serving."""
+    try:
+        with timed("warmup", "db_pool"):
+            warm_pool()
+    except Exception as e:
+        print(f"Warm-up: database not available yet: {e}")
+
+    # Delta-sync columns and triggers (DDL stays out of request handlers)
+    try:
+        with timed("warmup", "sync_schema"):
+            for table, state in migrate_sync_schema().items():
+                if state not in ("ready", "no table"):
+                    print(f"Warm-up: delta sync on {table}: {state}")
+    except Exception as e:
+        print(f"Warm-up: delta sync schema not set up: {e}")
+
+    with timed("warmup", "employee_snapshot"):
+        employee_store.refresh()
+        employee_store.snapshot()
+    employee_store.start_refresher()
+
+    try:
+        with timed("warmup", "demand_snapshot"):
+            demand_store.refresh()
+            demand_store.snapshot()
+    except Exception as e:
+        print(f"Warm-up: demands snapshot not available yet: {e}")
+    demand_store.start_refresher()
+    change_feed.start()
+
+    report = startup_report()
+    print(f"Startup: {report['total_ms']} ms {report}")
+    yield
+    employee_store.stop_refresher()
+    demand_store.stop_refresher()
+    change_feed.stop()
+    close_parse_pool()
+    close_pool()
+
+
+app = FastAPI(title="Dynamic Demand Dashboard", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -26,8 +85,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store employees in memory
-employees_db = mock_employees.copy()
+# Employees come from a snapshot of the `employees` table that all workers
+# memory-map read-only (see employee_store.py)
+employee_store = EmployeeStore()
+
+# Columnar snapshot of `demands`, republished after each upload
+# (see demand_snapshot.py)
+demand_store = DemandSnapshotStore()
+
+# One LISTEN connection per worker, fanned out to `/demands/stream` clients
+# (see change_feed.py); a resync first makes this worker re-check the demands
+# snapshot, so the refetch it triggers reads the newly published version
+change_feed = ChangeFeed(before_resync=demand_store.expire)
+
+# Seconds between SSE keep-alive comments on an idle stream
+STREAM_KEEPALIVE = 15.0
+
+# Bitmap facet indexes behind the `/search` endpoints, kept current with
+# delta syncs (see facets.py)
+employee_facets = SyncedFacets(
+    "employees",
+    ["team", "availability", "skills"],
+    to_record=lambda row: employee_from_row(row).model_dump(mode="json"),
+    fallback=lambda: [e.model_dump(mode="json") for e in employee_store.snapshot().employees()],
+    fallback_version=lambda: employee_store.snapshot().version,
+)
+# Until the demands table has the sync schema, searches read the demands snapshot
+demand_facets = SyncedFacets(
+    "demands",
+    ["role", "location", "status"],
+    to_record=lambda row: row,
+    descending=True,
+    fallback=lambda: json.loads(demand_store.snapshot().rows_json()),
+    fallback_version=lambda: demand_store.snapshot().version,
+)
 
 
 # ============================================
@@ -38,39 +129,66 @@ def root():
     return {"message": "Dynamic Demand Dashboard API Running"}
 
 
+@app.get("/startup-report")
+def get_startup_report():
+    """Where startup time went: eager imports, lazily loaded dependencies and warm-up steps (ms)."""
+    return startup_report()
+
+
 # ============================================
 # Employee Endpoints
 # ============================================
 @app.get("/employees", response_model=List[Employee])
 def get_employees():
     """Get all employees"""
-    return employees_db
+    # Served straight from the pre-serialized snapshot
+    return Response(content=employee_store.snapshot().json_bytes(), media_type="application/json")
 
 
+@app.get("/employees/snapshot")
+def get_employee_snapshot():
+    """Version and source of the employee snapshot this worker is serving"""
+    return employee_store.snapshot().meta
 
-@app.get("/employees/{employee_id}", response_model=Employee)
-def get_employee(employee_id: int):
-    """Get employee by ID"""
-    for emp in employees_db:
-        if emp.id == employee_id:
-            return emp
-    raise HTTPException(status_code=404, detail="Employee not found")
 
+@app.post("/employees/snapshot/refresh")
+def refresh_employee_snapshot(force: bool = Query(False)):
+    """Rebuild the shared employee snapshot if the employees table changed (or always with force=true)"""
+    try:
+        return employee_store.refresh(force=force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+# Fixed paths are declared before /employees/{employee_id}, which would
+# otherwise capture them (and reject them as non-integer ids)
 @app.get("/employees/filter", response_model=List[Employee])
 def filter_employees(
     skill: Optional[str] = Query(None),
     availability: Optional[str] = Query(None),
     team: Optional[str] = Query(None),
 ):
-    """Filter employees by skill, availability, and/or team"""
-    results = employees_db.copy()
-
-    if skill:
-        results = [
-            emp for emp in results
-            if any(skill.lower() in s.lower() for s in emp.skills)
-        ]
+    """Filter employees by skill (aliases and typos resolved, see skills.py), availability, and/or team"""
+    snapshot = employee_store.snapshot()
+    canonical = SKILLS.resolve(skill) if skill else set()
+
+    if canonical:
+        # Only the matching records are decoded from the shared mapping, and
+        # kept for later requests
+        by_skill = snapshot.by_skill()
+        if len(canonical) == 1:
+            ids = by_skill.get(next(iter(canonical)), ())
+        else:
+            ids = sorted({i for name in canonical for i in by_skill.get(name, ())})
+        get = snapshot.get
+        results = [get(i) for i in ids]
+    else:
+        results = snapshot.employees()
+        if skill:
+            # Not a skill we know: fall back to a substring match
+            results = [
+                emp for emp in results
+                if any(skill.lower() in s.lower() for s in emp.skills)
+            ]
 
     if availability:
         results = [emp for emp in results if emp.availability.lower() == availability.lower()]
@@ -81,10 +199,54 @@ def filter_employees(
     return results
 
 
+@app.get("/employees/search")
+def search_employees(
+    skill: Optional[str] = Query(None, description="Skill, alias (k8s) or misspelling"),
+    team: Optional[List[str]] = Query(None),
+    availability: Optional[List[str]] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    One page of matching employees plus facet counts per team, availability and skill:
+    {"total", "offset", "limit", "items": [Employee], "facets": {field: {value: count}}}
+    """
+    filters = {"team": team, "availability": availability}
+    contains = []
+    if skill:
+        skills = resolve_terms(employee_facets, "skills", SKILLS, [skill])
+        if skills:
+            filters["skills"] = sorted(skills)
+        else:
+            # Not a skill we know: fall back to a substring match
+            filters["skills"] = [skill]
+            contains = ["skills"]
+    return facet_search(employee_facets, filters, offset, limit, contains=contains)
+
+
+@app.get("/employees/changes")
+def get_employee_changes(since: Optional[str] = Query(None, description="Watermark from the previous call; omit for a full sync")):
+    """
+    Employees changed and ids deleted since `since`, plus the watermark to pass
+    next time: {"watermark", "full", "changed": [Employee], "deleted": [id]}
+    """
+    return sync_changes("employees", since)
+
+
+@app.get("/employees/{employee_id}", response_model=Employee)
+def get_employee(employee_id: int):
+    """Get employee by ID"""
+    raw = employee_store.snapshot().get_json(employee_id)
+    if raw is not None:
+        return Response(content=raw, media_type="application/json")
+    raise HTTPException(status_code=404, detail="Employee not found")
+
+
 # ============================================
 # AI-Powered Search Endpoint
 # ============================================
 @app.post("/employees/ai-search", response_model=List[Employee])
+@traced("employees_ai_search", result_ids=lambda employees: [e.id for e in employees])
 def ai_search_employees(task_description: str = Query(..., description="Description of the task or requirement")):
     """
     Use AI to intelligently search for employees capable of handling a task.
@@ -96,13 +258,15 @@ def ai_search_employees(task_description: str = Query(..., description="Descript
         raise HTTPException(status_code=400, detail="Task description cannot be empty")
     
     try:
-        suitable_employees = get_ai_agent_recommendation(task_description, employees_db)
+        ai_agent = lazy_import("ai_agent")
+        suitable_employees = ai_agent.get_ai_agent_recommendation(task_description, employee_store.snapshot().employees())
         return suitable_employees
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing AI search: {str(e)}")
 
 
 @app.post("/employees/ai-sql-search", response_model=List[Employee])
+@traced("employees_ai_sql_search", result_ids=lambda employees: [e.id for e in employees], table="employees")
 def ai_sql_search_employees(task_description: str = Query(..., description="Natural language query that will be translated to SQL")):
     """
     Use Gemini to generate a safe SQL SELECT for the employees table, execute it against PostgreSQL, and return matching employees.
@@ -112,7 +276,8 @@ def ai_sql_search_employees(task_description: str = Query(..., description="Natu
         raise HTTPException(status_code=400, detail="Task description cannot be empty")
 
     # Generate SQL using AI
-    sql = generate_sql_from_task(task_description, table_name='employees')
+    ai_agent = lazy_import("ai_agent")
+    sql = ai_agent.generate_sql_from_task(task_description, table_name='employees')
     if not sql:
         raise HTTPException(status_code=500, detail="Failed to generate a safe SQL query for the request")
 
@@ -122,20 +287,13 @@ def ai_sql_search_employees(task_description: str = Query(..., description="Natu
         raise HTTPException(status_code=400, detail="Generated SQL did not pass safety checks")
 
     try:
-        rows = execute_read_query(sql)
+        with stage("execute"):
+            rows = execute_read_query(sql)
         # Convert rows to Employee models (best-effort mapping)
         employees_res = []
         for r in rows:
             try:
-                emp = Employee(
-                    id=int(r.get('id')),
-                    name=r.get('name') or r.get('full_name') or 'Unknown',
-                    skills=r.get('skills') if isinstance(r.get('skills'), list) else (json.loads(r.get('skills')) if r.get('skills') else []),
-                    qualifications=r.get('qualifications') if isinstance(r.get('qualifications'), list) else (json.loads(r.get('qualifications')) if r.get('qualifications') else []),
-                    strength=int(r.get('strength') or 0),
-                    availability=r.get('availability') or 'Unknown',
-                    team=r.get('team') or 'Unknown'
-                )
+                emp = employee_from_row(r)
             except Exception:
                 # Skip invalid rows
                 continue
@@ -147,6 +305,7 @@ def ai_sql_search_employees(task_description: str = Query(..., description="Natu
 
 
 @app.post("/demands/ai-sql-search")
+@traced("demands_ai_sql_search", result_ids=lambda res: [r.get("id") for r in res["rows"]], table="demands")
 def demands_ai_sql_search(task_description: str = Query(..., description="Natural language query that will be translated to SQL")):
     """
     Use Gemini to generate a safe SQL SELECT for the `demands` table, execute it against PostgreSQL, and return matching demand rows.
@@ -156,7 +315,14 @@ def demands_ai_sql_search(task_description: str = Query(..., description="Natura
         raise HTTPException(status_code=400, detail="Task description cannot be empty")
 
     # Generate SQL using AI for the demands table
-    sql = generate_sql_from_task(task_description, table_name='demands')
+    try:
+        with stage("roles"):
+            roles = demand_store.snapshot().distinct("role")
+    except Exception:
+        roles = None
+
+    ai_agent = lazy_import("ai_agent")
+    sql = ai_agent.generate_sql_from_task(task_description, table_name='demands', roles=roles)
     if not sql:
         raise HTTPException(status_code=500, detail="Failed to generate a safe SQL query for the request")
 
@@ -166,11 +332,13 @@ def demands_ai_sql_search(task_description: str = Query(..., description="Natura
         raise HTTPException(status_code=400, detail="Generated SQL did not pass safety checks")
 
     try:
-        rows = execute_read_query(sql)
+        with stage("execute"):
+            rows = execute_read_query(sql)
         return {"generated_sql": sql, "rows": rows}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error executing generated SQL: {str(e)}")
 
+
 @app.post("/upload-excel")
 async def upload_excel(
     file: UploadFile = File(...),
@@ -180,140 +348,31 @@ async def upload_excel(
         debug_log = {}
 
         contents = await file.read()
-
-        if file.filename.endswith(".csv"):
-            df = pd.read_csv(BytesIO(contents))
-        else:
-            df = pd.read_excel(BytesIO(contents))
+        # Parsing, loading and publishing run in the threadpool, so the event
+        # loop (and every open /demands/stream) isn't blocked meanwhile
+        df = await run_in_threadpool(read_frame, file.filename, contents)
 
         if df.empty:
             raise HTTPException(status_code=400, detail="Excel file is empty")
 
-        # Normalize column names
-        df.columns = [c.replace(" ", "_").lower() for c in df.columns]
-
-        # Convert NaN / NaT
-        df = df.replace({np.nan: None, pd.NaT: None})
-        for col in df.columns:
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[col] = df[col].where(df[col].notnull(), None)
+        df = await run_in_threadpool(normalize_upload_frame, df)
+        typed, column_types = await run_in_threadpool(infer_types, df)
 
         debug_log["upload_columns"] = df.columns.tolist()
+        debug_log["column_types"] = column_types
 
-        conn = get_connection()
-        cur = conn.cursor()
-
-        # Check table existence
-        cur.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables
-                WHERE table_name = %s
-            );
-        """, (tableName.lower(),))
-        table_exists = cur.fetchone()[0]
-
-        debug_log["table_exists"] = table_exists
-
-        # Auto-detect unique key for UPSERT
-        preferred_keys = ["id", "rolecode", "project_id"]
-
-        upsert_key = None
-        for key in preferred_keys:
-            if key in df.columns:
-                upsert_key = key
-                break
-
-        debug_log["upsert_key"] = upsert_key
-
-        # If table does not exist → create table with SERIAL id if missing
-        if not table_exists:
-            debug_log["action"] = "creating_new_table"
-
-            column_defs = []
-            for col in df.columns:
-                series = df[col]
-                if pd.api.types.is_integer_dtype(series):
-                    dtype = "INTEGER"
-                elif pd.api.types.is_float_dtype(series):
-                    dtype = "FLOAT"
-                elif pd.api.types.is_bool_dtype(series):
-                    dtype = "BOOLEAN"
-                elif pd.api.types.is_datetime64_any_dtype(series):
-                    dtype = "TIMESTAMP"
-                else:
-                    dtype = "TEXT"
-                column_defs.append(f'"{col}" {dtype}')
-
-            # If Excel doesn't include id, add SERIAL id
-            if "id" not in df.columns:
-                create_table_sql = f"""
-                    CREATE TABLE "{tableName}" (
-                        internal_id SERIAL PRIMARY KEY,
-                        {", ".join(column_defs)}
-                    );
-                """
-            else:
-                # Use Excel id as primary key
-                create_table_sql = f"""
-                    CREATE TABLE "{tableName}" (
-                        {", ".join(column_defs)},
-                        PRIMARY KEY (id)
-                    );
-                """
-
-            debug_log["create_table_sql"] = create_table_sql
-            cur.execute(create_table_sql)
-            conn.commit()
+        debug_log.update(await run_in_threadpool(load_frame, tableName, df, typed, column_types))
 
-        else:
-            debug_log["action"] = "upsert_into_existing_table"
-
-        cols = df.columns.tolist()
-
-        if upsert_key:
-            # UPSERT query
-            insert_sql = sql.SQL("""
-                INSERT INTO {table} ({fields})
-                VALUES ({values})
-                ON CONFLICT ({key})
-                DO UPDATE SET
-                {updates}
-            """).format(
-                table=sql.Identifier(tableName),
-                fields=sql.SQL(", ").join(map(sql.Identifier, cols)),
-                values=sql.SQL(", ").join(sql.Placeholder() * len(cols)),
-                key=sql.Identifier(upsert_key),
-                updates=sql.SQL(", ").join(
-                    sql.SQL(f"{col} = EXCLUDED.{col}") for col in cols if col != upsert_key
-                ),
-            )
-        else:
-            # Insert only
-            insert_sql = sql.SQL("""
-                INSERT INTO {table} ({fields})
-                VALUES ({values})
-            """).format(
-                table=sql.Identifier(tableName),
-                fields=sql.SQL(", ").join(map(sql.Identifier, cols)),
-                values=sql.SQL(", ").join(sql.Placeholder() * len(cols)),
-            )
-
-        inserted = 0
-        updated = 0
-
-        for _, row in df.iterrows():
+        # Publish the new demands snapshot for all workers, then tell stream
+        # clients that need a full refetch (it reads the snapshot)
+        if tableName.lower() == "demands":
             try:
-                cur.execute(insert_sql, list(row.values))
-                inserted += 1
-            except Exception:
-                updated += 1
-
-        conn.commit()
-        cur.close()
-        conn.close()
-
-        debug_log["inserted"] = inserted
-        debug_log["updated"] = updated
+                published = await run_in_threadpool(demand_store.refresh, force=True)
+                debug_log["snapshot_version"] = published["version"]
+            except Exception as e:
+                debug_log["snapshot_error"] = str(e)
+            if debug_log.get("resync"):
+                await run_in_threadpool(announce_resync)
 
         return {
             "message": f"Upload completed for table '{tableName}'",
@@ -323,6 +382,52 @@ async def upload_excel(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/upload-batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    tableMap: Optional[str] = Form(None, description='JSON {"part, sheet or file name": "table"}')
+):
+    """
+    Ingest several parts in one request: every sheet of each workbook, every
+    CSV and the files inside zip archives. Sheets are parsed in parallel in a
+    process pool and loaded concurrently (one table per pooled connection).
+    Each part goes to the table named after its sheet / file unless `tableMap`
+    says otherwise. Failed parts are reported without stopping the others.
+    """
+    try:
+        uploads = [(f.filename, await f.read()) for f in files]
+        table_map = json.loads(tableMap) if tableMap else {}
+
+        parts = await run_in_threadpool(split_parts, uploads, table_map)
+        if not parts:
+            raise HTTPException(status_code=400, detail="No CSV files or workbook sheets found in the upload")
+
+        results = await run_in_threadpool(ingest_batch, parts)
+
+        response = {
+            "message": f"Batch upload: {sum(r['status'] == 'loaded' for r in results)} of {len(results)} parts loaded",
+            "parts": results,
+        }
+
+        # Publish the new demands snapshot for all workers, then tell stream
+        # clients that need a full refetch (it reads the snapshot)
+        demand_results = [r for r in results if r["table"] == "demands"]
+        if any(r.get("inserted") or r.get("updated") for r in demand_results):
+            try:
+                published = await run_in_threadpool(demand_store.refresh, force=True)
+                response["snapshot_version"] = published["version"]
+            except Exception as e:
+                response["snapshot_error"] = str(e)
+            if any(r.get("resync") for r in demand_results):
+                await run_in_threadpool(announce_resync)
+
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/tables")
 def list_tables():
     try:
@@ -339,7 +444,7 @@ def list_tables():
         tables = [row[0] for row in cur.fetchall()]
 
         cur.close()
-        conn.close()
+        release_connection(conn)
 
         return {"tables": tables}
 
@@ -359,101 +464,179 @@ def analyze_demands():
     - Avg billing rate per role
     """
     try:
-        # Fetch all demand rows
-        rows = execute_read_query("SELECT * FROM demands")
+        snap = demand_store.snapshot()
 
-        if not rows:
+        if not len(snap):
             return {"message": "No demand data available", "data": {}}
 
-        df = pd.DataFrame(rows)
-
-        # Normalize column names
-        df.columns = [c.lower() for c in df.columns]
-
         insights = {}
 
+        def counts(col, label):
+            pairs, _ = snap.value_counts(col)
+            return [{label: v, "count": n} for v, n in pairs]
+
         # -----------------------------
         # 1️⃣ Role Demand Count
         # -----------------------------
-        if "role" in df.columns:
-            role_counts = df["role"].value_counts().reset_index().rename(
-                columns={"index": "role", "role": "count"}
-            )
-            insights["role_demand"] = role_counts.to_dict(orient="records")
+        if "role" in snap:
+            insights["role_demand"] = counts("role", "role")
 
         # -----------------------------
         # 2️⃣ Location Demand Count
         # -----------------------------
-        if "location" in df.columns:
-            loc_counts = df["location"].value_counts().reset_index().rename(
-                columns={"index": "location", "location": "count"}
-            )
-            insights["location_demand"] = loc_counts.to_dict(orient="records")
+        if "location" in snap:
+            insights["location_demand"] = counts("location", "location")
 
         # -----------------------------
         # 3️⃣ Status Distribution
         # -----------------------------
-        if "status" in df.columns:
-            status_counts = df["status"].value_counts().reset_index().rename(
-                columns={"index": "status", "status": "count"}
-            )
-            insights["status_distribution"] = status_counts.to_dict(orient="records")
+        if "status" in snap:
+            insights["status_distribution"] = counts("status", "status")
 
         # -----------------------------
         # 4️⃣ Probability Distribution
         # -----------------------------
-        if "probability" in df.columns:
-            prob_counts = df["probability"].value_counts().reset_index().rename(
-                columns={"index": "probability", "probability": "count"}
-            )
-            insights["probability_distribution"] = prob_counts.to_dict(orient="records")
+        if "probability" in snap:
+            insights["probability_distribution"] = counts("probability", "probability")
 
         # -----------------------------
         # 5️⃣ Monthly Demand Trend (from startMonth or originalStartDate)
         # -----------------------------
-        if "startmonth" in df.columns:
-            df["startmonth"] = df["startmonth"].astype(str)
-            trend = df["startmonth"].value_counts().sort_index().reset_index()
-            trend.columns = ["month", "count"]
-            insights["monthly_trend"] = trend.to_dict(orient="records")
-
-        elif "originalstartdate" in df.columns:
-            df["month"] = pd.to_datetime(df["originalstartdate"]).dt.to_period("M").astype(str)
-            trend = df["month"].value_counts().sort_index().reset_index()
-            trend.columns = ["month", "count"]
-            insights["monthly_trend"] = trend.to_dict(orient="records")
+        if "startmonth" in snap and snap.kind("startmonth") == "datetime":
+            insights["monthly_trend"] = [
+                {"month": m, "count": n}
+                for m, n in sorted(month_counts(snap, "startmonth", null_key="None").items())
+            ]
+
+        elif "startmonth" in snap:
+            pairs, nulls = snap.value_counts("startmonth")
+            trend = {}
+            for v, n in pairs:
+                trend[str(v)] = trend.get(str(v), 0) + n
+            if nulls:
+                trend["None"] = trend.get("None", 0) + nulls
+            insights["monthly_trend"] = [{"month": m, "count": n} for m, n in sorted(trend.items())]
+
+        elif "originalstartdate" in snap:
+            insights["monthly_trend"] = [
+                {"month": m, "count": n} for m, n in sorted(month_counts(snap, "originalstartdate").items())
+            ]
 
         # -----------------------------
         # 6️⃣ Billing Rate per Role
         # -----------------------------
-        if "billingrate" in df.columns and "role" in df.columns:
-            billing = (
-                df.groupby("role")["billingrate"]
-                .mean()
-                .reset_index()
-                .rename(columns={"billingrate": "avg_billing_rate"})
-                .sort_values("avg_billing_rate", ascending=False)
-            )
-            insights["billing_rate_by_role"] = billing.to_dict(orient="records")
+        if "billingrate" in snap and "role" in snap:
+            billing = [
+                {"role": role, "avg_billing_rate": avg}
+                for role, avg in snap.group_mean("role", "billingrate")
+            ]
+            billing.sort(key=lambda r: (r["avg_billing_rate"] is None, -(r["avg_billing_rate"] or 0)))
+            insights["billing_rate_by_role"] = billing
 
         # -----------------------------
         # 7️⃣ Allocation Percentage Analysis
         # -----------------------------
-        if "allocationpercentage" in df.columns:
-            alloc_data = (
-                df["allocationpercentage"]
-                .dropna()
-                .value_counts()
-                .reset_index()
-                .rename(columns={"index": "allocation", "allocationpercentage": "count"})
-            )
-            insights["allocation_distribution"] = alloc_data.to_dict(orient="records")
+        if "allocationpercentage" in snap:
+            insights["allocation_distribution"] = counts("allocationpercentage", "allocation")
 
         return {"message": "Demand analytics processed", "analytics": insights}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def month_counts(snap, col, null_key="NaT"):
+    """Rows per calendar month ("YYYY-MM") of a date column; NULL / unparseable values count under `null_key`."""
+    np = lazy_import("numpy")
+    pd = lazy_import("pandas")
+
+    if snap.kind(col) == "datetime":
+        values = snap.array(col, "values")
+        months = values[~np.isnat(values)].astype("datetime64[M]")
+        uniq, n = np.unique(months, return_counts=True)
+        result = {str(m): int(c) for m, c in zip(uniq, n)}
+        nulls = int(np.isnat(values).sum())
+    else:
+        # TEXT column (table created before typed ingest): only the distinct
+        # values are parsed, with the upload's explicit formats
+        pairs, nulls = snap.value_counts(col)
+        parsed, _ = parse_with_formats(pd.Series([str(v) for v, _ in pairs], dtype=object), DATE_FORMATS + TIMESTAMP_FORMATS)
+        result = {}
+        for ts, (_, c) in zip(parsed, pairs):
+            key = ts.strftime("%Y-%m") if not pd.isna(ts) else null_key
+            result[key] = result.get(key, 0) + c
+    if nulls:
+        result[null_key] = result.get(null_key, 0) + nulls
+    return result
+
+
+def compute_demand_analytics(snap):
+    """
+    Build the `/analytics/demands` payload from the demands snapshot.
+    All values are native Python types.
+    """
+    # ---------- SAFE CONVERTER ----------
+    def counts_with_unknown(col, key=str):
+        """value -> count with NULLs as "Unknown" (missing columns count as all NULL)."""
+        if col not in snap:
+            return {"Unknown": len(snap)} if len(snap) else {}
+        pairs, nulls = snap.value_counts(col)
+        result = {}
+        for v, n in pairs:
+            k = key(v)
+            result[k] = result.get(k, 0) + n
+        if nulls:
+            result["Unknown"] = result.get("Unknown", 0) + nulls
+        return dict(sorted(result.items(), key=lambda kv: -kv[1]))
+
+    def safe_float(val):
+        return float(val) if val is not None else 0.0
+
+    # ---------- ANALYTICS ----------
+
+    # Role distribution (whitespace-normalized)
+    role_dist = counts_with_unknown("role", key=lambda x: " ".join(str(x).split()))
+
+    # Location distribution
+    location_dist = counts_with_unknown("location")
+
+    # Status
+    status_dist = counts_with_unknown("status")
+
+    # Probability
+    probability_dist = counts_with_unknown("probability")
+
+    # Months (typed DATE columns are bucketed as "YYYY-MM")
+    if "startmonth" in snap and snap.kind("startmonth") == "datetime":
+        month_dist = dict(sorted(month_counts(snap, "startmonth", null_key="Unknown").items()))
+    elif "startmonth" in snap:
+        month_dist = dict(sorted(counts_with_unknown("startmonth").items()))
+    else:
+        month_dist = {}
+
+    # Accounts
+    account_dist = counts_with_unknown("account_id")
+
+    # Averages
+    avg_billing = safe_float(snap.mean("billingrate") if "billingrate" in snap else 0)
+    avg_allocation = safe_float(snap.mean("allocationpercentage") if "allocationpercentage" in snap else 0)
+
+    # Top roles
+    top_roles = dict(list(counts_with_unknown("role").items())[:10])
+
+    return {
+        "roles": role_dist,
+        "locations": location_dist,
+        "status": status_dist,
+        "probability": probability_dist,
+        "months": month_dist,
+        "accounts": account_dist,
+        "avg_billing_rate": avg_billing,
+        "avg_allocation": avg_allocation,
+        "top_roles": top_roles
+    }
+
+
 @app.get("/analytics/demands")
 def analytics_demands():
     """
@@ -463,86 +646,168 @@ def analytics_demands():
     """
 
     try:
-        rows = execute_read_query("SELECT * FROM demands;")
-        if not rows:
+        snap = demand_store.snapshot()
+        if not len(snap):
             return {"error": "No demand data found"}
 
-        df = pd.DataFrame(rows)
-        df = df.replace({np.nan: None, pd.NaT: None})
+        return compute_demand_analytics(snap)
 
-        # Convert date columns
-        date_cols = ["originalstartdate", "allocationenddate", "fulfillmentdate", "addedon", "updatedon"]
-        for col in date_cols:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col], errors="coerce")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # ---------- SAFE CONVERTER ----------
-        def safe_int_dict(series):
-            return {str(k): int(v) for k, v in series.items()}
+@app.get("/demands")
+def get_all_demands():
+    try:
+        # Pre-serialized in ORDER BY id DESC when the snapshot was published
+        return Response(content=demand_store.snapshot().rows_json(), media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        def safe_str_dict(series):
-            return {str(k): str(v) for k, v in series.items()}
 
-        def safe_float(val):
-            return float(val) if val is not None else 0.0
+@app.get("/demands/stream")
+async def stream_demands(request: Request):
+    """
+    Server-Sent Events with the rows each upload inserts or updates in
+    `demands`, so clients patch their copy of `/demands` instead of refetching.
 
-        # ---------- ANALYTICS ----------
+    event: demands   data: {"inserted": [row, ...], "updated": [row, ...]}
+    event: resync    data: {}   (refetch `/demands`)
+    """
+    queue = change_feed.subscribe()
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                data = {k: v for k, v in event.items() if k != "type"}
+                yield f"event: {event['type']}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            change_feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/demands/stream/status")
+def demand_stream_status():
+    """Listener state and subscriber count of this worker's change feed"""
+    return {
+        "listening": change_feed.connected,
+        "subscribers": change_feed.subscriber_count,
+        "events": change_feed.events,
+    }
+
+
+@app.get("/demands/search")
+def search_demands(
+    role: Optional[List[str]] = Query(None),
+    location: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    One page of matching demands (newest id first) plus facet counts per role,
+    location and status: {"total", "offset", "limit", "items": [row], "facets"}
+    """
+    filters = {"role": role, "location": location, "status": status}
+    if role:
+        filters["role"] = sorted(resolve_terms(demand_facets, "role", ROLES, role)) or role
+    return facet_search(demand_facets, filters, offset, limit)
 
-        # Role distribution
-        role_dist = (
-            df["role"]
-            .fillna("Unknown")
-            .apply(lambda x: " ".join(str(x).split()))
-            .value_counts()
-        )
-        role_dist = safe_int_dict(role_dist)
 
-        # Location distribution
-        location_dist = safe_int_dict(df["location"].fillna("Unknown").value_counts())
+def resolve_terms(facets, field, taxonomy, terms):
+    """
+    Indexed values of `field` the filter terms mean (aliases and typos
+    resolved with the taxonomy), including rows stored under an alias.
+    """
+    try:
+        values = facets.values(field)
+    except Exception:
+        # Index unavailable: facet_search reports why
+        values = []
+    taxonomy.update(values)
+    resolved = set()
+    for term in terms:
+        resolved |= taxonomy.resolve(term)
+    return resolved | {v for v in values if taxonomy.canonical(v) in resolved}
+
+
+def facet_search(facets, filters, offset, limit, contains=()):
+    """Search a facet index; repeat a filter parameter to match any of several values."""
+    try:
+        result = facets.search(filters, contains=contains, offset=offset, limit=limit)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=json.dumps(result, default=json_default), media_type="application/json")
 
-        # Status
-        status_dist = safe_int_dict(df["status"].fillna("Unknown").value_counts())
 
-        # Probability
-        probability_dist = safe_int_dict(df["probability"].fillna("Unknown").astype(str).value_counts())
+@app.get("/demands/changes")
+def get_demand_changes(since: Optional[str] = Query(None, description="Watermark from the previous call; omit for a full sync")):
+    """
+    Demands inserted / updated and ids deleted since `since` (by `updatedOn`),
+    plus the watermark to pass next time:
+    {"watermark", "full", "changed": [row], "deleted": [id]}
+    """
+    return sync_changes("demands", since)
 
-        # Months
-        if "startmonth" in df.columns:
-            month_dist = safe_int_dict(df["startmonth"].fillna("Unknown").value_counts().sort_index())
-        else:
-            month_dist = {}
 
-        # Accounts
-        account_dist = safe_int_dict(df["account_id"].fillna("Unknown").value_counts())
+def sync_changes(table: str, since: Optional[str]):
+    """Delta (or full) sync response for a table tracked by sync.py."""
+    try:
+        conn = get_connection()
+        try:
+            if not sync_ready(conn, table):
+                raise HTTPException(status_code=404, detail=f"Table '{table}' does not exist")
+            result = changes_since(conn, table, since)
+        finally:
+            release_connection(conn)
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid watermark: {since}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Averages
-        avg_billing = safe_float(df["billingrate"].dropna().mean() if "billingrate" in df else 0)
-        avg_allocation = safe_float(df["allocationpercentage"].dropna().mean() if "allocationpercentage" in df else 0)
+    if table == "employees":
+        employees = []
+        for r in result["changed"]:
+            try:
+                employees.append(employee_from_row(r).model_dump(mode="json"))
+            except Exception:
+                # Skip invalid rows, as the snapshot does
+                continue
+        result["changed"] = employees
 
-        # Top roles
-        top_roles = safe_int_dict(
-            df["role"].fillna("Unknown").value_counts().head(10)
-        )
+    return Response(content=json.dumps(result, default=json_default), media_type="application/json")
 
-        return {
-            "roles": role_dist,
-            "locations": location_dist,
-            "status": status_dist,
-            "probability": probability_dist,
-            "months": month_dist,
-            "accounts": account_dist,
-            "avg_billing_rate": avg_billing,
-            "avg_allocation": avg_allocation,
-            "top_roles": top_roles
-        }
 
+@app.get("/demands/snapshot")
+def get_demand_snapshot():
+    """Version and source of the demands snapshot this worker is serving"""
+    try:
+        return demand_store.snapshot().meta
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/demands")
-def get_all_demands():
+
+@app.post("/demands/snapshot/refresh")
+def refresh_demand_snapshot(force: bool = Query(False)):
+    """Republish the demands snapshot if the table changed (or always with force=true)"""
     try:
-        rows = execute_read_query("SELECT * FROM demands ORDER BY id DESC;")
-        return rows   # already Python-native because read_query returns dict
+        return demand_store.refresh(force=force)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+record_since("imports", "main", _import_started)
@@ -0,0 +1,153 @@
+"""
+Structured, replayable log of AI search requests.
+
+When AI_REQUEST_LOG is set, every call to `/employees/ai-search`,
+`/employees/ai-sql-search` and `/demands/ai-sql-search` appends one JSON line
+to it:
+
+    {"id", "ts", "endpoint", "task", "table", "model", "sql", "fallback",
+     "result_ids", "result_count", "timings_ms": {stage: ms}, "total_ms",
+     "status", "error"}
+
+Stages are timed where they happen (`with stage("model"): ...` in
+ai_agent.py, `with stage("execute"): ...` in main.py) and attach to the
+request being traced on the current thread, so the agent code doesn't need to
+be handed a trace object. `benchmarks/replay.py` replays a log offline.
+"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, Optional
+
+# JSON lines file the AI requests are appended to. Off unless set: records
+# hold the raw task text users typed, and the file is never rotated or pruned
+AI_REQUEST_LOG = os.getenv("AI_REQUEST_LOG", "")
+
+# Result ids kept per request (result_count always has the full count)
+MAX_LOGGED_IDS = 500
+
+_current = contextvars.ContextVar("ai_request_trace", default=None)
+_fd = None
+_fd_path = None
+_fd_lock = threading.Lock()
+
+
+class RequestTrace:
+    """One AI request being recorded."""
+
+    def __init__(self, endpoint: str, task: str, **fields):
+        self.started = time.perf_counter()
+        self.record = {
+            "id": uuid.uuid4().hex,
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "endpoint": endpoint,
+            "task": task,
+            **fields,
+            "timings_ms": {},
+        }
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings = self.record["timings_ms"]
+            timings[name] = round(timings.get(name, 0.0) + (time.perf_counter() - start) * 1000.0, 3)
+
+    def set(self, **fields):
+        if "result_ids" in fields:
+            ids = list(fields.pop("result_ids"))
+            self.record["result_count"] = len(ids)
+            self.record["result_ids"] = ids[:MAX_LOGGED_IDS]
+        self.record.update(fields)
+
+    def finish(self, status: int = 200, error: Optional[str] = None):
+        self.record["total_ms"] = round((time.perf_counter() - self.started) * 1000.0, 3)
+        self.record["status"] = status
+        self.record["error"] = error
+        write_record(self.record)
+
+
+@contextmanager
+def trace_request(endpoint: str, task: str, **fields) -> Iterator[RequestTrace]:
+    """Record the request run inside the block; exceptions are logged with their status and re-raised."""
+    trace = RequestTrace(endpoint, task, **fields)
+    token = _current.set(trace)
+    try:
+        yield trace
+    except Exception as e:
+        trace.finish(status=getattr(e, "status_code", 500), error=str(getattr(e, "detail", e)))
+        raise
+    else:
+        trace.finish()
+    finally:
+        _current.reset(token)
+
+
+def traced(endpoint: str, result_ids: Callable[[Any], list], **fields):
+    """
+    Decorator for an endpoint taking `task_description`: records the request,
+    with the ids `result_ids` extracts from the endpoint's return value.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_request(endpoint, kwargs.get("task_description"), **fields) as trace:
+                result = func(*args, **kwargs)
+                trace.set(result_ids=result_ids(result))
+                return result
+        return wrapper
+    return decorate
+
+
+def stage(name: str):
+    """Time a stage of the request traced on this thread (no-op outside one)."""
+    trace = _current.get()
+    return trace.stage(name) if trace is not None else nullcontext()
+
+
+def record(**fields):
+    """Attach fields to the request traced on this thread (no-op outside one)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.set(**fields)
+
+
+def write_record(entry: dict):
+    """Append one JSON line; a single O_APPEND write, so workers don't interleave lines."""
+    global _fd, _fd_path
+    path = AI_REQUEST_LOG
+    if not path:
+        return
+    line = (json.dumps(entry, default=str) + "\n").encode()
+    try:
+        with _fd_lock:
+            if _fd is None or _fd_path != path:
+                if _fd is not None:
+                    os.close(_fd)
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                _fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                _fd_path = path
+            os.write(_fd, line)
+    except OSError as e:
+        print(f"AI request log: could not write to {path}: {e}")
+
+
+def read_log(path: str) -> Iterator[dict]:
+    """Records of a request log, oldest first (unparseable lines are skipped)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,285 @@
+"""
+Skill and role normalization.
+
+A `Taxonomy` maps every spelling it knows (canonical names and aliases,
+compared by `key()`: lowercase without spaces, dots, dashes, underscores or
+slashes, so "Node JS", "node.js" and "NodeJS" are one key) to a canonical
+name, and keeps the keys in a BK-tree for typo-tolerant lookup:
+
+    canonical(name)  alias lookup only; used at ingest, never guesses
+    resolve(term)    alias lookup, then the canonical names of the nearest
+                     keys within a length-dependent edit distance; used at
+                     query time ("kubernets" -> {"Kubernetes"})
+    mentioned(text)  names in free text: exact keys, plus at most one typo in
+                     single words of 7+ characters; spellings that are also
+                     common English words ("go", "express") only count when
+                     the context says they are meant as a skill
+
+Matching is by canonical name, not substring, so "react" no longer matches
+"reactive" and "k8s" / "Node" find "Kubernetes" / "Node.js". Values seen in
+the data but missing from the taxonomy are registered with `add()` and then
+resolve like any other name.
+"""
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+# Canonical skill -> aliases
+SKILL_TAXONOMY = {
+    "React": ["ReactJS", "React.js"],
+    "React Native": ["RN"],
+    "Angular": ["AngularJS", "Angular.js"],
+    "Vue.js": ["Vue", "VueJS"],
+    "JavaScript": ["JS", "ECMAScript", "ES6"],
+    "TypeScript": ["TS"],
+    "HTML": ["HTML5"],
+    "CSS": ["CSS3"],
+    "Node.js": ["Node", "NodeJS"],
+    "Express": ["Express.js", "ExpressJS"],
+    "Python": ["py", "Python3"],
+    "FastAPI": [],
+    "Django": [],
+    "Flask": [],
+    "Java": [],
+    "Spring Boot": ["Spring", "SpringBoot"],
+    "Go": ["Golang"],
+    "C#": ["CSharp", "C Sharp"],
+    ".NET": ["dotnet", "dot net", "ASP.NET"],
+    "SQL": [],
+    "PostgreSQL": ["Postgres", "psql", "PG"],
+    "MySQL": [],
+    "MongoDB": ["Mongo"],
+    "GraphQL": ["GQL"],
+    "Docker": [],
+    "Kubernetes": ["k8s", "kube"],
+    "Terraform": ["TF"],
+    "AWS": ["Amazon Web Services"],
+    "Azure": ["Microsoft Azure"],
+    "GCP": ["Google Cloud", "Google Cloud Platform"],
+    "DevOps": [],
+    "CI/CD": ["CICD", "Continuous Integration"],
+    "Machine Learning": ["ML"],
+    "Deep Learning": ["DL"],
+    "TensorFlow": [],
+    "PyTorch": ["Torch"],
+    "Data Analysis": ["Data Analytics"],
+    "Selenium": [],
+    "Figma": [],
+    "Unqork": [],
+    "Scrum": [],
+}
+
+# Canonical demand role -> aliases (role codes included)
+ROLE_TAXONOMY = {
+    "Application Engineer": ["AE", "App Engineer"],
+    "Sr. Application Engineer": ["Sr AE", "Senior Application Engineer", "Sr. AE"],
+    "Application Engineering Lead": ["AE Lead", "Application Engineer Lead"],
+    "QA Engineer": ["QA", "Quality Assurance Engineer", "Test Engineer"],
+    "UX Engineer": ["UXE"],
+    "UX Designer": ["UXD"],
+    "Solution Architect": ["SA", "Solutions Architect"],
+    "Business Analyst": ["BA"],
+    "Scrum Master": ["Scrum"],
+    "DevOps Engineer": ["DevOps"],
+}
+
+# Spellings that are ordinary words in a task description ("go live",
+# "express interest"). `mentioned()` only counts them capitalized inside a
+# sentence ("Need a Node developer") or next to a CONTEXT_WORDS word ("go
+# microservices", "experience with node")
+SKILL_COMMON_WORDS = ["Go", "Express", "Spring", "Node", "Torch"]
+
+CONTEXT_WORDS = {
+    "developer", "developers", "dev", "devs", "engineer", "engineers", "programmer",
+    "programming", "experience", "experienced", "knowledge", "backend", "frontend",
+    "microservice", "microservices", "service", "services", "api", "apis", "server",
+    "stack", "framework", "code", "codebase",
+}
+
+# Words either side of a common word searched for CONTEXT_WORDS
+CONTEXT_WINDOW = 2
+
+_SEPARATORS = re.compile(r"[\s._\-/]+")
+
+# Fuzzy lookups remembered per taxonomy before the cache is reset
+RESOLVE_CACHE_SIZE = 10000
+
+
+@lru_cache(maxsize=65536)
+def key(name: str) -> str:
+    """Comparison key of a spelling."""
+    return _SEPARATORS.sub("", str(name).lower())
+
+
+def max_distance(term_key: str) -> int:
+    # Short keys are too close to each other for typo tolerance
+    if len(term_key) <= 3:
+        return 0
+    if len(term_key) <= 5:
+        return 1
+    return 2
+
+
+def levenshtein(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree over keys with Levenshtein distance."""
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, word: str):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            d = levenshtein(word, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = (word, {})
+                return
+            node = child
+
+    def search(self, word: str, radius: int) -> List[tuple]:
+        """(distance, key) of every key within `radius` of `word`."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_word, children = stack.pop()
+            d = levenshtein(word, node_word)
+            if d <= radius:
+                found.append((d, node_word))
+            for edge, child in children.items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return found
+
+
+class Taxonomy:
+    """Canonical names with aliases plus a BK-tree over all keys."""
+
+    def __init__(self, entries: Dict[str, List[str]], common_words: Iterable[str] = (), max_edits: int = 2):
+        self.canonical_by_key: Dict[str, str] = {}
+        self.common_words = {key(w) for w in common_words}
+        self.max_edits = max_edits
+        self.tree = BKTree()
+        self._resolved: Dict[str, frozenset] = {}
+        self._lock = threading.Lock()
+        for name, aliases in entries.items():
+            for spelling in [name, *aliases]:
+                self._register(key(spelling), name)
+
+    def _register(self, k: str, name: str):
+        if k and k not in self.canonical_by_key:
+            self.canonical_by_key[k] = name
+            self.tree.add(k)
+
+    def add(self, name: Optional[str]):
+        """Register a value seen in the data (no-op when its key is known)."""
+        if not name or key(name) in self.canonical_by_key:
+            return
+        with self._lock:
+            self._register(key(name), str(name).strip())
+            # Earlier fuzzy results may have a closer match now
+            self._resolved.clear()
+
+    def update(self, names: Iterable[str]):
+        for name in names:
+            self.add(name)
+
+    def canonical(self, name):
+        """Canonical name for a known spelling, else the value itself (stripped)."""
+        if not isinstance(name, str):
+            return name
+        return self.canonical_by_key.get(key(name), name.strip())
+
+    def resolve(self, term: str) -> Set[str]:
+        """Canonical names `term` may mean: its alias, else the nearest typo matches."""
+        k = key(term)
+        if not k:
+            return set()
+        if k in self.canonical_by_key:
+            return {self.canonical_by_key[k]}
+        return set(self._nearest(k, min(max_distance(k), self.max_edits)))
+
+    def _nearest(self, k: str, radius: int) -> frozenset:
+        cached = self._resolved.get((k, radius))
+        if cached is None:
+            # add() inserts into the tree from other threads
+            with self._lock:
+                matches = self.tree.search(k, radius)
+            if matches:
+                best = min(d for d, _ in matches)
+                cached = frozenset(self.canonical_by_key[w] for d, w in matches if d == best)
+            else:
+                cached = frozenset()
+            if len(self._resolved) >= RESOLVE_CACHE_SIZE:
+                self._resolved.clear()
+            self._resolved[(k, radius)] = cached
+        return cached
+
+    def _meant_as_skill(self, words: List[str], starts: List[bool], i: int) -> bool:
+        # A common word is taken as the skill when capitalized mid-sentence
+        # ("a Node developer") or near a context word ("go microservices")
+        if words[i][:1].isupper() and not starts[i]:
+            return True
+        first = i
+        while first > max(0, i - CONTEXT_WINDOW) and not starts[first]:
+            first -= 1
+        last = i
+        while last < min(len(words) - 1, i + CONTEXT_WINDOW) and not starts[last + 1]:
+            last += 1
+        # Only the same sentence
+        nearby = words[first:i] + words[i + 1:last + 1]
+        return any(w.lower() in CONTEXT_WORDS for w in nearby)
+
+    def mentioned(self, text: str, max_words: int = 3) -> Set[str]:
+        """Canonical names mentioned in free text (phrases of up to `max_words` words)."""
+        words, starts = [], []
+        end = 0
+        for match in re.finditer(r"[\w#+.]+", text):
+            # Sentence start: the first word, or a stop since the previous one
+            # (a trailing "." is part of the previous match)
+            starts.append(not words or any(c in ".!?;:" for c in text[end - 1:match.start()]))
+            words.append(match.group().rstrip("."))
+            end = match.end()
+        found = set()
+        for n in range(1, max_words + 1):
+            for i in range(len(words) - n + 1):
+                k = key(" ".join(words[i:i + n]))
+                if not k:
+                    continue
+                if k in self.common_words and (n > 1 or not self._meant_as_skill(words, starts, i)):
+                    continue
+                if k in self.canonical_by_key:
+                    found.add(self.canonical_by_key[k])
+                # One typo, in longer single words only: in running text
+                # short words are too often other English words
+                elif n == 1 and len(k) >= 7:
+                    found |= self._nearest(k, 1)
+        return found
+
+
+SKILLS = Taxonomy(SKILL_TAXONOMY, common_words=SKILL_COMMON_WORDS)
+# Role names share most of their letters ("QA Engineer" / "UX Engineer"):
+# at most one typo
+ROLES = Taxonomy(ROLE_TAXONOMY, max_edits=1)
+
+
+def canonical_skills(skills: Iterable[str]) -> List[str]:
+    """Canonical, de-duplicated skill list (order kept)."""
+    return list(dict.fromkeys(SKILLS.canonical(s) for s in skills if s))
@@ -0,0 +1,243 @@
+"""
+Versioned, read-only snapshots shared by all uvicorn workers.
+
+A dataset (employees, demands, ...) is written once into SNAPSHOT_DIR (tmpfs
+at /dev/shm by default) and memory-mapped by every worker. A small pointer
+file (`<name>.current`) names the live version. Publishing writes
+`<name>-<version><suffix>` next to it and swaps the pointer with os.replace,
+so readers see either the old or the new version, never a partial one. Only
+one process publishes at a time (flock on `<name>.lock`).
+
+Subclasses describe the dataset: how to fingerprint and load the source, how
+to write a snapshot and how to open one.
+"""
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional
+
+# How often a worker stats the pointer file to pick up a new version
+POINTER_CHECK_INTERVAL = 1.0
+
+
+def default_snapshot_dir() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.getenv("SNAPSHOT_DIR") or os.path.join(base, "demand-dashboard")
+
+
+class SnapshotStore:
+    """
+    Per-worker handle on one dataset's snapshots.
+
+    `snapshot()` returns the live version (remapping when another worker has
+    published a newer one); `refresh()` republishes when the source changed.
+    """
+
+    name = None
+    # "" for single-file snapshots, "/" for snapshot directories
+    suffix = ""
+    # Serve the fallback data (instead of failing) when the source is unreachable
+    # and nothing has been published yet
+    fallback_when_unreachable = True
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or default_snapshot_dir()
+        self.pointer_path = os.path.join(self.directory, f"{self.name}.current")
+        self.lock_path = os.path.join(self.directory, f"{self.name}.lock")
+        self._current = None
+        self._pointer_stat = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- dataset specific ----------
+
+    def source_fingerprint(self) -> Optional[str]:
+        """Cheap change marker for the source, None if it does not exist. Raises if unreachable."""
+        raise NotImplementedError
+
+    def load_source(self):
+        raise NotImplementedError
+
+    def fallback_source(self):
+        """Data to serve when the source does not exist."""
+        raise NotImplementedError
+
+    def write(self, path: str, data):
+        """Write `data` as a snapshot at `path` (a file, or a directory if suffix is "/")."""
+        raise NotImplementedError
+
+    def open(self, path: str, meta: dict):
+        raise NotImplementedError
+
+    # ---------- reading ----------
+
+    def read_pointer(self) -> Optional[dict]:
+        try:
+            with open(self.pointer_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _stat_pointer(self):
+        try:
+            st = os.stat(self.pointer_path)
+            return (st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def _map(self, meta: dict):
+        try:
+            return self.open(os.path.join(self.directory, meta["file"]), meta)
+        except FileNotFoundError:
+            # Superseded and removed between reading the pointer and opening it
+            meta = self.read_pointer()
+            return self.open(os.path.join(self.directory, meta["file"]), meta)
+
+    def snapshot(self):
+        """The live snapshot; publishes one first if none exists yet."""
+        now = time.monotonic()
+        if self._current is not None and now - self._checked_at < POINTER_CHECK_INTERVAL:
+            return self._current
+
+        with self._lock:
+            self._checked_at = now
+            stat_key = self._stat_pointer()
+            if stat_key is None:
+                self.refresh()
+                stat_key = self._stat_pointer()
+
+            if stat_key != self._pointer_stat or self._current is None:
+                meta = self.read_pointer()
+                if self._current is None or meta["version"] != self._current.version:
+                    self._current = self._map(meta)
+                self._pointer_stat = stat_key
+            return self._current
+
+    def expire(self):
+        """Re-check the pointer on next access (another worker just published)."""
+        self._checked_at = 0.0
+
+    # ---------- writing ----------
+
+    def refresh(self, force: bool = False) -> dict:
+        """
+        Publish a new snapshot if the source changed (or `force`).
+        Without a source the fallback data is served. If the source is
+        unreachable the current snapshot is kept.
+        """
+        current = self.read_pointer()
+        try:
+            fingerprint = self.source_fingerprint()
+        except Exception as e:
+            if current is not None:
+                return current
+            if not self.fallback_when_unreachable:
+                raise
+            print(f"{self.name} snapshot: source not available, serving fallback data: {e}")
+            fingerprint = None
+
+        source = "postgres" if fingerprint is not None else "fallback"
+        fingerprint = fingerprint or "fallback"
+        if current and current["fingerprint"] == fingerprint and not force:
+            return current
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Another worker may have published while we waited
+                current = self.read_pointer()
+                if current and current["fingerprint"] == fingerprint and not force:
+                    return current
+                data = self.load_source() if source == "postgres" else self.fallback_source()
+                return self._publish(data, fingerprint, source, current)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def publish(self, data, fingerprint: str, source: str) -> dict:
+        """Publish explicit data as the next snapshot version."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return self._publish(data, fingerprint, source, self.read_pointer())
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _publish(self, data, fingerprint, source, current) -> dict:
+        version = (current["version"] + 1) if current else 1
+        name = f"{self.name}-{version}{self.suffix.rstrip('/')}"
+
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix=f".{self.name}-")
+        if self.suffix == "/":
+            target = tmp
+        else:
+            target = os.path.join(tmp, "snapshot")
+        extra = self.write(target, data) or {}
+        os.replace(target, os.path.join(self.directory, name))
+        shutil.rmtree(tmp, ignore_errors=True)
+
+        meta = {
+            "version": version,
+            "file": name,
+            "fingerprint": fingerprint,
+            "source": source,
+            "created_at": time.time(),
+            **extra,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".pointer-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.pointer_path)
+        # Read-your-writes in this worker: re-check the pointer on next access
+        self._checked_at = 0.0
+
+        self._remove_old_versions(keep=version)
+        return meta
+
+    def _remove_old_versions(self, keep: int):
+        # Workers still mapping an unlinked file keep it alive until they remap
+        prefix = f"{self.name}-"
+        for entry in os.listdir(self.directory):
+            if not entry.startswith(prefix):
+                continue
+            try:
+                version = int(entry[len(prefix):].split(".")[0])
+            except ValueError:
+                continue
+            if version < keep - 1:
+                path = os.path.join(self.directory, entry)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+
+    # ---------- background refresh ----------
+
+    def start_refresher(self, interval: float):
+        if interval <= 0 or self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"{self.name} snapshot refresh failed: {e}")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name=f"{self.name}-snapshot-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+        self._thread = None
@@ -0,0 +1,62 @@
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+
+# Process-wide record of where startup time goes:
+# - "imports": the eager import of the app module
+# - "lazy_imports": heavy dependencies, timed on first use
+# - "warmup": steps run by the lifespan hook
+_report = {
+    "imports": {},
+    "lazy_imports": {},
+    "warmup": {},
+    "errors": {},
+}
+
+
+def lazy_import(name: str):
+    """
+    Import a module on first use and record how long the import took.
+    Always goes through importlib: a module another thread is still importing
+    is already in sys.modules, and only the import lock waits for it to finish.
+    """
+    first = name not in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    if first:
+        record_since("lazy_imports", name, started)
+    return module
+
+
+def record_since(section: str, name: str, started: float):
+    """Store the milliseconds elapsed since `started` (a perf_counter value)."""
+    _report[section].setdefault(name, round((time.perf_counter() - started) * 1000, 2))
+
+
+@contextmanager
+def timed(section: str, name: str):
+    """Time a block and store it under `section` / `name` in the report (milliseconds)."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        _report["errors"][name] = str(e)
+        raise
+    finally:
+        _report[section][name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def startup_report() -> dict:
+    return {
+        "imports": dict(_report["imports"]),
+        "lazy_imports": dict(_report["lazy_imports"]),
+        "warmup": dict(_report["warmup"]),
+        "errors": dict(_report["errors"]),
+        "total_ms": round(
+            sum(_report["imports"].values())
+            + sum(_report["lazy_imports"].values())
+            + sum(_report["warmup"].values()),
+            2,
+        ),
+    }
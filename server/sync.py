@@ -0,0 +1,321 @@
+"""
+Delta sync for `demands` and `employees`: "what changed since watermark W?"
+
+Each tracked table has a change column maintained by a trigger:
+    demands    updatedon  TIMESTAMP, set to the writing transaction's now()
+    employees  version    BIGINT, the writing transaction's id (xid8)
+and deletes leave a tombstone in `sync_tombstones` (same two markers).
+
+A delta returns the rows and tombstones with since <= marker < watermark and
+the new watermark. The watermark never passes a transaction that is still in
+progress (oldest running transaction start for demands, snapshot xmin for
+employees), so rows committed late by a long upload are not skipped. Both
+change columns are indexed: a sync reads only what changed.
+
+Watermarks are opaque strings for clients; pass back the last one received.
+
+Setting a table up takes DDL locks, so it never happens in a read request: the
+server runs `migrate()` at startup and uploads set up the tables they create
+or load. A legacy TEXT demands.updatedon is only converted on request
+(`python -m sync --convert-updatedon`); until then demand syncs fail with
+SyncSchemaError and the column is left as it is.
+"""
+import threading
+from datetime import datetime
+from typing import Optional
+
+from db import decode_rows, get_connection, release_connection
+from startup import lazy_import
+
+TOMBSTONES_SQL = """
+    CREATE TABLE IF NOT EXISTS sync_tombstones (
+        table_name TEXT NOT NULL,
+        row_id TEXT NOT NULL,
+        deleted_at TIMESTAMP NOT NULL,
+        deleted_version BIGINT NOT NULL,
+        PRIMARY KEY (table_name, row_id)
+    );
+    CREATE INDEX IF NOT EXISTS sync_tombstones_deleted_at_idx ON sync_tombstones (table_name, deleted_at);
+    CREATE INDEX IF NOT EXISTS sync_tombstones_deleted_version_idx ON sync_tombstones (table_name, deleted_version);
+
+    CREATE OR REPLACE FUNCTION sync_record_delete() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO sync_tombstones (table_name, row_id, deleted_at, deleted_version)
+        VALUES (TG_TABLE_NAME, OLD.id::text, LOCALTIMESTAMP, pg_current_xact_id()::text::bigint)
+        ON CONFLICT (table_name, row_id)
+        DO UPDATE SET deleted_at = EXCLUDED.deleted_at, deleted_version = EXCLUDED.deleted_version;
+        RETURN OLD;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION sync_touch_updatedon() RETURNS trigger AS $$
+    BEGIN
+        NEW.updatedon := LOCALTIMESTAMP;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION sync_touch_version() RETURNS trigger AS $$
+    BEGIN
+        NEW.version := pg_current_xact_id()::text::bigint;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql;
+"""
+
+# Legacy TEXT updatedOn values. The export is month-first (MM-DD-YYYY HH:MM or
+# M/D/YYYY H:MM, as in ingest.py); {dash} is the dash format, day-first only
+# when the column's dash dates can't be month-first
+UPDATEDON_FROM_TEXT = r"""
+    CASE
+        WHEN updatedon ~ '^\d{{1,2}}/\d{{1,2}}/\d{{4}}' THEN to_timestamp(updatedon, 'MM/DD/YYYY HH24:MI')::timestamp
+        WHEN updatedon ~ '^\d{{1,2}}-\d{{1,2}}-\d{{4}}' THEN to_timestamp(updatedon, '{dash} HH24:MI')::timestamp
+        WHEN updatedon ~ '^\d{{4}}-\d{{2}}-\d{{2}}' THEN updatedon::timestamp
+    END
+"""
+
+# table -> (change column, its type, trigger function)
+TRACKED = {
+    "demands": ("updatedon", "TIMESTAMP", "sync_touch_updatedon"),
+    "employees": ("version", "BIGINT", "sync_touch_version"),
+}
+
+# information_schema data_type of each change column once installed
+INSTALLED_TYPES = {"TIMESTAMP": "timestamp without time zone", "BIGINT": "bigint"}
+
+_prepared = set()
+_prepare_lock = threading.Lock()
+
+
+class SyncSchemaError(RuntimeError):
+    """A tracked table exists but delta sync is not set up on it."""
+
+
+def _table_exists(cur, table: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cur.fetchone()[0]
+
+
+def _column_type(cur, table: str) -> Optional[str]:
+    cur.execute(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+        (table, TRACKED[table][0]),
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _convert_updatedon(cur):
+    # Dash dates are month-first unless one has a leading part above 12 and
+    # none a middle part above 12
+    cur.execute(r"""
+        SELECT bool_or(split_part(updatedon, '-', 1)::int > 12), bool_or(split_part(updatedon, '-', 2)::int > 12)
+        FROM demands WHERE updatedon ~ '^\d{1,2}-\d{1,2}-\d{4}'
+    """)
+    first_over_12, second_over_12 = cur.fetchone()
+    dash = "DD-MM-YYYY" if first_over_12 and not second_over_12 else "MM-DD-YYYY"
+    using = UPDATEDON_FROM_TEXT.format(dash=dash)
+
+    # Refuse rather than turn values no format matches into NULL
+    cur.execute(f"SELECT count(*) FROM demands WHERE NULLIF(trim(updatedon), '') IS NOT NULL AND ({using}) IS NULL")
+    unparsed = cur.fetchone()[0]
+    if unparsed:
+        raise SyncSchemaError(f"{unparsed} demands.updatedon values match no known format; fix them before migrating")
+    cur.execute(f"ALTER TABLE demands ALTER COLUMN updatedon TYPE TIMESTAMP USING ({using})")
+
+
+def ensure_sync_schema(conn, table: str, convert: bool = False) -> bool:
+    """
+    Install the change column, its index and the triggers on `table` (once per
+    process). Commits on `conn`. Returns False if the table does not exist yet.
+
+    An existing demands.updatedon of another type (legacy TEXT exports) is
+    only rewritten with `convert` (`python -m sync --convert-updatedon`);
+    otherwise SyncSchemaError is raised and the table is left untouched.
+    """
+    if table in _prepared:
+        return True
+
+    with _prepare_lock:
+        if table in _prepared:
+            return True
+        column, column_type, touch = TRACKED[table]
+        cur = conn.cursor()
+        if not _table_exists(cur, table):
+            cur.close()
+            conn.rollback()
+            return False
+
+        try:
+            # Serialize with other workers doing the same
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('sync_schema'))")
+            cur.execute(TOMBSTONES_SQL)
+
+            existing = _column_type(cur, table)
+            if existing is None:
+                cur.execute(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {column_type}')
+            elif existing != INSTALLED_TYPES[column_type]:
+                if not convert:
+                    raise SyncSchemaError(
+                        f'"{table}.{column}" is {existing}, not {column_type}: '
+                        f"run `python -m sync --convert-updatedon` to convert it"
+                    )
+                if existing in ("text", "character varying"):
+                    _convert_updatedon(cur)
+                else:
+                    cur.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{column}" TYPE {column_type} USING "{column}"::timestamp')
+
+            cur.execute(f'CREATE INDEX IF NOT EXISTS "{table}_{column}_idx" ON "{table}" ("{column}")')
+            cur.execute(f'DROP TRIGGER IF EXISTS "{table}_sync_touch" ON "{table}"')
+            cur.execute(
+                f'CREATE TRIGGER "{table}_sync_touch" BEFORE INSERT OR UPDATE ON "{table}" '
+                f"FOR EACH ROW EXECUTE FUNCTION {touch}()"
+            )
+            cur.execute(f'DROP TRIGGER IF EXISTS "{table}_sync_delete" ON "{table}"')
+            cur.execute(
+                f'CREATE TRIGGER "{table}_sync_delete" AFTER DELETE ON "{table}" '
+                f"FOR EACH ROW EXECUTE FUNCTION sync_record_delete()"
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+        _prepared.add(table)
+        return True
+
+
+def sync_ready(conn, table: str) -> bool:
+    """
+    Whether delta sync is set up on `table`, without changing anything (for
+    request handlers). False if the table does not exist; SyncSchemaError if
+    it exists but was created outside an upload and not migrated yet.
+    """
+    if table in _prepared:
+        return True
+    column, column_type, _ = TRACKED[table]
+    cur = conn.cursor()
+    try:
+        if not _table_exists(cur, table):
+            return False
+        existing = _column_type(cur, table)
+        installed = existing == INSTALLED_TYPES[column_type]
+        cur.execute(
+            "SELECT count(*) FROM pg_trigger WHERE tgrelid = to_regclass(%s) AND tgname IN (%s, %s)",
+            (table, f"{table}_sync_touch", f"{table}_sync_delete"),
+        )
+        installed = installed and cur.fetchone()[0] == 2 and _table_exists(cur, "sync_tombstones")
+    finally:
+        cur.close()
+        conn.rollback()
+    if existing is not None and existing != INSTALLED_TYPES[column_type]:
+        raise SyncSchemaError(
+            f'"{table}.{column}" is {existing}, not {column_type}: '
+            f"run `python -m sync --convert-updatedon` to convert it"
+        )
+    if not installed:
+        raise SyncSchemaError(f"Delta sync is not set up on '{table}': restart the server or run `python -m sync`")
+    _prepared.add(table)
+    return True
+
+
+def forget_schema(table: str):
+    """Re-check the schema on next use (e.g. after the table was recreated)."""
+    _prepared.discard(table)
+
+
+def migrate(convert: bool = False) -> dict:
+    """Set up delta sync on every tracked table that exists: {table: status}."""
+    status = {}
+    conn = get_connection()
+    try:
+        for table in TRACKED:
+            try:
+                status[table] = "ready" if ensure_sync_schema(conn, table, convert=convert) else "no table"
+            except SyncSchemaError as e:
+                status[table] = str(e)
+    finally:
+        release_connection(conn)
+    return status
+
+
+def _watermark(cur, table: str):
+    if table == "demands":
+        # Every transaction still running started at or after this point, so
+        # all rows stamped before it are committed (or rolled back) for good
+        cur.execute("""
+            SELECT LEAST(LOCALTIMESTAMP, min(xact_start)::timestamp)
+            FROM pg_stat_activity
+            WHERE datname = current_database()
+              AND xact_start IS NOT NULL
+              AND pid <> pg_backend_pid();
+        """)
+    else:
+        # Transaction ids below the snapshot xmin are all finished
+        cur.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint;")
+    return cur.fetchone()[0]
+
+
+def parse_watermark(table: str, since: Optional[str]):
+    """Client watermark -> change column value (None for a full sync). Raises ValueError."""
+    if not since:
+        return None
+    if table == "demands":
+        return datetime.fromisoformat(since)
+    return int(since)
+
+
+def changes_since(conn, table: str, since: Optional[str]) -> dict:
+    """
+    {"since", "watermark", "full", "changed": [rows], "deleted": [ids]} for
+    `table`. Without `since` every row is returned (full sync), no tombstones.
+    Apply `deleted` before `changed`: a re-inserted id is in both.
+    """
+    extras = lazy_import("psycopg2.extras")
+    column = TRACKED[table][0]
+    start = parse_watermark(table, since)
+
+    # One snapshot for the watermark, the rows and the tombstones
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    try:
+        cur = conn.cursor(cursor_factory=extras.RealDictCursor)
+        end = _watermark(conn.cursor(), table)
+
+        deleted = []
+        if start is None:
+            cur.execute(f'SELECT * FROM "{table}" ORDER BY id DESC;')
+        else:
+            marker = "deleted_at" if table == "demands" else "deleted_version"
+            cur.execute(
+                f"SELECT row_id FROM sync_tombstones WHERE table_name = %s AND {marker} >= %s AND {marker} < %s;",
+                (table, start, end),
+            )
+            deleted = [r["row_id"] for r in cur.fetchall()]
+            cur.execute(
+                f'SELECT * FROM "{table}" WHERE "{column}" >= %s AND "{column}" < %s ORDER BY id DESC;',
+                (start, end),
+            )
+        changed = decode_rows(cur.fetchall())
+        cur.close()
+    finally:
+        conn.rollback()
+        conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT")
+
+    return {
+        "since": since,
+        "watermark": end.isoformat() if table == "demands" else str(end),
+        "full": start is None,
+        "changed": changed,
+        "deleted": deleted,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Set up delta sync on the tracked tables.")
+    parser.add_argument(
+        "--convert-updatedon", action="store_true",
+        help="rewrite a legacy TEXT demands.updatedon as TIMESTAMP (refuses if any value doesn't parse)",
+    )
+    args = parser.parse_args()
+    for table, state in migrate(convert=args.convert_updatedon).items():
+        print(f"{table}: {state}")
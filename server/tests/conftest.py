@@ -0,0 +1,36 @@
+"""
+Unit tests for the server modules. Run from the `server/` directory:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+from benchmarks import fake_gemini  # noqa: E402
+
+# Never reach the real Gemini API from a test
+fake_gemini.install(latency_ms=0, jitter_ms=0)
+
+
+@pytest.fixture(scope="session")
+def pg():
+    """Connection factory for a throwaway embedded Postgres, with `db` pointed at it."""
+    pytest.importorskip("pgserver")
+    import db
+    from benchmarks.postgres import local_postgres
+
+    with local_postgres("embedded") as connect:
+        # db reads the PG* variables at import time, possibly before this fixture ran
+        db.DB_HOST, db.DB_PORT = os.environ["PGHOST"], os.environ["PGPORT"]
+        db.DB_NAME, db.DB_USER, db.DB_PASS = os.environ["PGDATABASE"], os.environ["PGUSER"], ""
+        db._pool = None
+        try:
+            yield connect
+        finally:
+            db.close_pool()
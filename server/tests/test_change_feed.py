@@ -0,0 +1,91 @@
+import time
+
+import change_feed
+from change_feed import ChangeFeed
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_listener_reconnect_tells_subscribers_to_resync(pg, monkeypatch):
+    monkeypatch.setattr(change_feed, "RECONNECT_DELAY", 0.1)
+    expired = []
+    feed = ChangeFeed(before_resync=lambda: expired.append(True))
+    events = []
+    monkeypatch.setattr(feed, "publish", events.append)
+
+    feed.start()
+    try:
+        assert wait_for(lambda: feed.connected)
+        assert events == []
+
+        conn = pg()
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE query LIKE %s AND pid <> pg_backend_pid()",
+            (f"LISTEN {change_feed.CHANNEL}%",),
+        )
+        conn.close()
+
+        assert wait_for(lambda: events == [{"type": "resync"}])
+        assert expired == [True]
+    finally:
+        feed.stop()
+
+
+def test_notify_reaches_stream_subscribers(pg):
+    import asyncio
+
+    import main
+
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS demands")
+    cur.execute("CREATE TABLE demands (id TEXT PRIMARY KEY, role TEXT)")
+    cur.execute("INSERT INTO demands VALUES ('1', 'AE')")
+    conn.commit()
+
+    class Client:
+        async def is_disconnected(self):
+            return False
+
+    async def read_stream():
+        response = await main.stream_demands(Client())
+        stream = response.body_iterator
+        assert await anext(stream) == "retry: 3000\n\n"
+
+        # An upload: new row and updated row, announced on commit
+        cur.execute("INSERT INTO demands VALUES ('2', 'SA')")
+        cur.execute("UPDATE demands SET role = 'QA' WHERE id = '1'")
+        assert change_feed.notify_changes(cur, ["2"], ["1"])
+        conn.commit()
+
+        try:
+            while True:
+                message = await asyncio.wait_for(anext(stream), timeout=10)
+                if not message.startswith(":"):
+                    return message
+        finally:
+            await stream.aclose()
+
+    main.change_feed.start()
+    try:
+        assert wait_for(lambda: main.change_feed.connected)
+        message = asyncio.run(read_stream())
+    finally:
+        main.change_feed.stop()
+        conn.close()
+
+    # Same row shapes as the `/demands` listing
+    assert message == (
+        "event: demands\n"
+        'data: {"inserted": [{"id": 2, "role": "SA"}], "updated": [{"id": 1, "role": "QA"}]}\n\n'
+    )
+    assert main.change_feed.subscriber_count == 0
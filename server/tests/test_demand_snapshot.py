@@ -0,0 +1,50 @@
+import shutil
+
+from demand_snapshot import DemandSnapshot, write_demand_snapshot
+
+
+def test_snapshot_stays_readable_after_its_files_are_deleted(tmp_path):
+    path = tmp_path / "demands-1"
+    path.mkdir()
+    rows = [
+        {"id": "D1", "role": "QA Engineer", "probability": 100, "billingrate": 25.0},
+        {"id": "D2", "role": "QA Engineer", "probability": None, "billingrate": None},
+        {"id": "D3", "role": "UX Designer", "probability": 50, "billingrate": 45.0},
+    ]
+    write_demand_snapshot(str(path), rows)
+    snapshot = DemandSnapshot(str(path), {"version": 1})
+
+    # A later publish removes this version while a request still holds it
+    shutil.rmtree(path)
+
+    assert snapshot.value_counts("role") == ([("QA Engineer", 2), ("UX Designer", 1)], 0)
+    assert snapshot.mean("probability") == 75.0
+    assert snapshot.mean("billingrate") == 35.0
+    assert b'"D3"' in snapshot.rows_json()
+
+
+def test_column_encodings(tmp_path):
+    import json
+    from datetime import date, datetime, timedelta, timezone
+
+    import numpy as np
+
+    path = tmp_path / "demands-1"
+    rows = [
+        {"id": "D1", "start": date(2025, 3, 1), "updated": datetime(2025, 3, 1, 9, 30, tzinfo=timezone(timedelta(hours=2))), "tags": ["a"]},
+        {"id": "D2", "start": None, "updated": datetime(2025, 3, 2, 10), "tags": None},
+        {"id": None, "start": date(2025, 4, 1), "updated": None, "tags": 1},
+    ]
+    write_demand_snapshot(str(path), rows)
+    snapshot = DemandSnapshot(str(path), {"version": 1})
+
+    assert snapshot.kind("start") == snapshot.kind("updated") == "datetime"
+    assert snapshot.array("start", "values").astype(str).tolist() == [
+        "2025-03-01T00:00:00.000000", "NaT", "2025-04-01T00:00:00.000000",
+    ]
+    # Aware timestamps are stored as naive UTC
+    assert snapshot.array("updated", "values")[0] == np.datetime64("2025-03-01T07:30", "us")
+    assert snapshot.categories("id") == ["D1", "D2"]
+    assert snapshot.array("id", "codes").tolist() == [0, 1, -1]
+    assert snapshot.categories("tags") == [["a"], 1]
+    assert json.loads(snapshot.rows_json())[0]["updated"] == "2025-03-01T09:30:00+02:00"
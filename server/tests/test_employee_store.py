@@ -0,0 +1,33 @@
+from employee_store import EmployeeSnapshot, write_snapshot
+from models import Employee
+
+
+def employee(id, skills, availability="Available"):
+    return Employee(
+        id=id, name=f"E{id}", skills=skills, qualifications=[], strength=80,
+        availability=availability, team="Backend",
+    )
+
+
+def test_by_skill_indexes_ids_by_canonical_skill(tmp_path):
+    path = str(tmp_path / "employees.snap")
+    write_snapshot(path, [employee(3, ["ReactJS", "React.js"]), employee(1, ["React", "k8s"]), employee(2, ["Go"])])
+    snapshot = EmployeeSnapshot(path, {"version": 1})
+
+    by_skill = snapshot.by_skill()
+
+    assert list(by_skill["React"]) == [1, 3]
+    assert list(by_skill["Kubernetes"]) == [1]
+    assert snapshot.get(3).skills == ["ReactJS", "React.js"]
+    assert snapshot.get(4) is None
+
+
+def test_decoded_employees_are_kept_per_snapshot(tmp_path):
+    path = str(tmp_path / "employees.snap")
+    write_snapshot(path, [employee(1, ["React"]), employee(2, ["Go"])])
+    snapshot = EmployeeSnapshot(path, {"version": 1})
+
+    first = snapshot.get(1)
+    assert snapshot.get(1) is first
+    assert snapshot.employees()[0] is first
+    assert snapshot.get(2) is snapshot.employees()[1]
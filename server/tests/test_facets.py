@@ -0,0 +1,189 @@
+import json
+
+from facets import FacetIndex, SyncedFacets
+
+
+def demand_record(row):
+    if not row.get("role"):
+        raise ValueError("role is required")
+    return {"id": row["id"], "role": row["role"]}
+
+
+def test_synced_facets_handle_mixed_ids_and_skip_invalid_rows():
+    facets = SyncedFacets("demands", ["role"], to_record=demand_record)
+    # decode_rows turns "1" into 1 and leaves "DEM-..." ids as strings
+    facets._apply({
+        "full": True,
+        "watermark": "w1",
+        "deleted": [],
+        "changed": [
+            {"id": "DEM-2025-002", "role": "AE"},
+            {"id": 10, "role": "AE"},
+            {"id": 2, "role": "SA"},
+            {"id": "DEM-2025-001", "role": None},
+        ],
+    })
+    page = facets.index.search({}, limit=10)
+    assert [item["id"] for item in page["items"]] == [2, 10, "DEM-2025-002"]
+    assert sorted(facets.index.values("role")) == ["AE", "SA"]
+
+    facets._apply({
+        "full": False,
+        "watermark": "w2",
+        "deleted": [],
+        "changed": [{"id": "DEM-2025-003", "role": "SA"}, {"id": 10, "role": ""}, {"id": 3, "role": "AE"}],
+    })
+    page = facets.index.search({"role": ["ae"]}, limit=10)
+    # Pages stay in id order after a delta; an invalid update drops the row
+    assert [item["id"] for item in page["items"]] == [3, "DEM-2025-002"]
+    assert facets.index.search({}, limit=10)["total"] == 4
+
+
+PEOPLE = [
+    (1, {"id": 1, "team": "Backend", "availability": "Available", "skills": ["Python", "Go"]}),
+    (2, {"id": 2, "team": "Backend", "availability": "Busy", "skills": ["Python"]}),
+    (3, {"id": 3, "team": "Frontend", "availability": "Available", "skills": ["React"]}),
+    (4, {"id": 4, "team": "Data", "availability": "Available", "skills": ["Python", "SQL"]}),
+]
+
+
+def people_index(descending=False):
+    index = FacetIndex(["team", "availability", "skills"], descending=descending)
+    index.load(PEOPLE)
+    return index
+
+
+def test_search_filters_and_facet_counts():
+    result = people_index().search({"skills": ["python"], "team": ["backend", "data"]})
+
+    # Any value within a field, every field, case-insensitive
+    assert result["total"] == 3
+    assert [r["id"] for r in result["items"]] == [1, 2, 4]
+    # A field's counts ignore its own filter
+    assert result["facets"]["team"] == {"Backend": 2, "Data": 1}
+    assert result["facets"]["skills"] == {"Python": 3, "Go": 1, "SQL": 1}
+    assert result["facets"]["availability"] == {"Available": 2, "Busy": 1}
+
+
+def test_search_substring_fields_and_paging():
+    index = people_index(descending=True)
+
+    result = index.search({"skills": ["eac"]}, contains=["skills"])
+    assert [r["id"] for r in result["items"]] == [3]
+
+    page = index.search({}, offset=1, limit=2)
+    assert (page["total"], [r["id"] for r in page["items"]]) == (4, [3, 2])
+    assert index.search({}, offset=4)["items"] == []
+
+
+def test_rebuilt_drops_deleted_slots_and_sorts():
+    index = people_index()
+    index.remove(2)
+    index.upsert(0, {"id": 0, "team": "QA", "availability": "Busy", "skills": []})
+    assert index.free == 1
+
+    rebuilt = index.rebuilt(lambda key: key)
+
+    assert (rebuilt.free, len(rebuilt)) == (0, 4)
+    assert [r["id"] for r in rebuilt.search({})["items"]] == [0, 1, 3, 4]
+    assert rebuilt.search({"availability": ["busy"]})["total"] == 1
+
+
+def test_fallback_is_rebuilt_only_when_its_version_changes(pg):
+    conn = pg()
+    conn.cursor().execute("DROP TABLE IF EXISTS employees")
+    conn.commit()
+    conn.close()
+    calls = []
+    version = [1]
+
+    def fallback():
+        calls.append(version[0])
+        return [record for _, record in reversed(PEOPLE)]
+
+    facets = SyncedFacets(
+        "employees", ["team"], to_record=dict, fallback=fallback, fallback_version=lambda: version[0],
+    )
+    for _ in range(3):
+        facets.checked = 0.0
+        result = facets.search({"team": ["backend"]})
+    assert calls == [1]
+    assert [r["id"] for r in result["items"]] == [1, 2]
+
+    version[0] = 2
+    facets.checked = 0.0
+    facets.search({})
+    assert calls == [1, 2]
+
+
+def load_demands(csv: bytes):
+    from ingest import infer_types, load_frame, normalize_upload_frame, read_frame
+
+    raw = normalize_upload_frame(read_frame("demands.csv", csv))
+    typed, column_types = infer_types(raw)
+    return load_frame("demands", raw, typed, column_types)
+
+
+def demand_facets(**kwargs):
+    return SyncedFacets("demands", ["role", "status"], to_record=lambda row: row, descending=True, **kwargs)
+
+
+def search(facets, filters=None):
+    facets.checked = 0.0
+    result = facets.search(filters or {}, limit=50)
+    return [r["id"] for r in result["items"]], result["facets"]
+
+
+def test_synced_demands_stay_in_id_order_through_deltas(pg, monkeypatch):
+    import facets as facets_module
+
+    conn = pg()
+    conn.cursor().execute("DROP TABLE IF EXISTS demands")
+    conn.commit()
+    load_demands(b"id,role,status\nD2,AE,Open\nD4,SA,Open\nD6,AE,Closed\n")
+    facets = demand_facets()
+
+    ids, counts = search(facets, {"status": ["open"]})
+    assert ids == ["D4", "D2"]
+    assert counts["role"] == {"AE": 1, "SA": 1}
+    assert counts["status"] == {"Open": 2, "Closed": 1}
+
+    # Updated in place; D3 sorts before existing ids, D7 after them
+    load_demands(b"id,role,status\nD4,SA,Closed\nD3,QA,Open\nD7,QA,Open\n")
+    ids, counts = search(facets)
+    assert ids == ["D7", "D6", "D4", "D3", "D2"]
+    assert counts["status"] == {"Open": 3, "Closed": 2}
+
+    monkeypatch.setattr(facets_module, "COMPACT_MIN_FREE", 1)
+    cur = conn.cursor()
+    cur.execute("DELETE FROM demands WHERE id IN ('D6', 'D7')")
+    conn.commit()
+    ids, counts = search(facets, {"role": ["qa"]})
+    assert ids == ["D3"]
+    assert counts["role"] == {"AE": 1, "QA": 1, "SA": 1}
+    assert facets.index.free == 0
+    conn.close()
+
+
+def test_demands_without_sync_schema_are_searched_in_the_snapshot(pg, tmp_path):
+    from demand_snapshot import DemandSnapshotStore
+    from sync import forget_schema
+
+    conn = pg()
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS demands")
+    cur.execute("CREATE TABLE demands (id TEXT PRIMARY KEY, role TEXT, status TEXT, updatedon TEXT)")
+    cur.execute("INSERT INTO demands VALUES ('1', 'AE', 'Open', '03-01-2025 00:00'), ('DEM-1', 'SA', 'Open', NULL)")
+    conn.commit()
+    forget_schema("demands")
+    store = DemandSnapshotStore(str(tmp_path))
+    facets = demand_facets(
+        fallback=lambda: json.loads(store.snapshot().rows_json()),
+        fallback_version=lambda: store.snapshot().version,
+    )
+
+    ids, counts = search(facets, {"status": ["open"]})
+
+    assert ids == ["DEM-1", 1]
+    assert counts["role"] == {"AE": 1, "SA": 1}
+    conn.close()
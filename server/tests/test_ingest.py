@@ -0,0 +1,60 @@
+import os
+from datetime import date
+
+import pandas as pd
+
+from ingest import align_to_table, frame_rows, infer_types, normalize_upload_frame, read_frame
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data-1762758208615-demands.csv")
+
+
+def load_sample():
+    with open(SAMPLE_CSV, "rb") as f:
+        return normalize_upload_frame(read_frame("demands.csv", f.read()))
+
+
+def test_infer_types_reads_the_export_month_first():
+    raw = load_sample()
+    typed, sql_types = infer_types(raw)
+
+    assert sql_types["originalstartdate"] == "DATE"
+    assert sql_types["startmonth"] == "DATE"
+    assert sql_types["addedon"] == "TIMESTAMP"
+
+    both = typed["originalstartdate"].notna() & typed["startmonth"].notna()
+    start, month = typed.loc[both, "originalstartdate"], typed.loc[both, "startmonth"]
+    # Rows start in their startMonth ("03-01-2025" / "25-Mar" is March 1st);
+    # a few rows of the export were rescheduled without updating startMonth
+    assert (start.dt.month == month.dt.month).mean() > 0.95
+    assert typed.loc[raw["originalstartdate"] == "03-01-2025", "originalstartdate"].iloc[0] == pd.Timestamp(2025, 3, 1)
+
+
+def test_infer_types_reads_unambiguous_dash_dates_day_first():
+    typed, sql_types = infer_types(pd.DataFrame({"d": ["25-03-2025", "01-04-2025", None]}))
+
+    assert sql_types["d"] == "DATE"
+    assert typed["d"].tolist()[:2] == [pd.Timestamp(2025, 3, 25), pd.Timestamp(2025, 4, 1)]
+
+
+def test_infer_types_keeps_mixed_columns_as_text():
+    raw = pd.DataFrame({"id": ["1", "DEM-7"], "flag": ["Y", "n"], "code": ["007", "010"], "n": ["1", "2.5"]})
+    typed, sql_types = infer_types(raw)
+
+    assert sql_types == {"id": "TEXT", "flag": "BOOLEAN", "code": "TEXT", "n": "FLOAT"}
+    assert typed["flag"].tolist() == [True, False]
+
+
+def test_frame_rows_binds_python_values():
+    raw = pd.DataFrame({"d": ["03-01-2025", None], "n": ["5", None]})
+    typed, sql_types = infer_types(raw)
+
+    assert frame_rows(typed, sql_types) == [(date(2025, 3, 1), 5), (None, None)]
+
+
+def test_align_to_table_keeps_strings_for_existing_text_columns():
+    raw = pd.DataFrame({"d": ["03-01-2025"], "n": ["5"]})
+    typed, sql_types = infer_types(raw)
+
+    assert align_to_table(raw, typed, sql_types, None) is typed
+    frame = align_to_table(raw, typed, sql_types, {"d": "text", "n": "integer"})
+    assert frame_rows(frame, {"d": "TEXT", "n": "INTEGER"}) == [("03-01-2025", 5)]
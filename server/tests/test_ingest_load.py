@@ -0,0 +1,62 @@
+from ingest import close_parse_pool, infer_types, ingest_batch, load_frame, normalize_upload_frame, read_frame
+
+BAD_ROW_CSV = b"id,role,probability\nX1,AE,50\nX2,AE,notanumber\nX3,AE,70\n"
+
+
+def committed_ids(connect, table):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(f'SELECT id FROM "{table}" ORDER BY id')
+    ids = [r[0] for r in cur.fetchall()]
+    conn.close()
+    return ids
+
+
+def create_table(connect, table):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(f'DROP TABLE IF EXISTS "{table}"')
+    cur.execute(f'CREATE TABLE "{table}" (id TEXT PRIMARY KEY, role TEXT, probability INTEGER)')
+    conn.commit()
+    conn.close()
+
+
+def test_batch_part_with_failed_rows_is_reported_failed(pg):
+    create_table(pg, "batch_bad_rows")
+    try:
+        [result] = ingest_batch([
+            {"name": "bad.csv", "filename": "bad.csv", "data": BAD_ROW_CSV, "sheet": None, "table": "batch_bad_rows"},
+        ])
+    finally:
+        close_parse_pool()
+
+    assert result["status"] == "failed"
+    assert (result["inserted"], result["failed"]) == (2, 1)
+    assert "1 of 3 rows could not be loaded" in result["error"]
+
+
+def test_failed_row_is_skipped_and_the_rest_committed(pg):
+    create_table(pg, "bad_rows")
+    raw = normalize_upload_frame(read_frame("bad.csv", BAD_ROW_CSV))
+    typed, column_types = infer_types(raw)
+
+    result = load_frame("bad_rows", raw, typed, column_types)
+
+    assert (result["inserted"], result["updated"], result["failed"]) == (2, 0, 1)
+    assert "notanumber" in result["first_error"]
+    assert committed_ids(pg, "bad_rows") == ["X1", "X3"]
+
+
+def test_demand_roles_are_stored_as_uploaded(pg):
+    conn = pg()
+    conn.cursor().execute("DROP TABLE IF EXISTS demands")
+    conn.commit()
+    raw = normalize_upload_frame(read_frame("demands.csv", b"id,role\nD1,AE\nD2,UXD\nD3,Application Engineer\n"))
+    typed, column_types = infer_types(raw)
+
+    load_frame("demands", raw, typed, column_types)
+
+    cur = conn.cursor()
+    cur.execute("SELECT role FROM demands ORDER BY id")
+    assert [r[0] for r in cur.fetchall()] == ["AE", "UXD", "Application Engineer"]
+    conn.close()
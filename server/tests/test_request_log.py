@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import request_log
+from request_log import read_log, record, stage, traced
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "ai_requests.jsonl")
+    monkeypatch.setattr(request_log, "AI_REQUEST_LOG", path)
+    return path
+
+
+class Failure(Exception):
+    status_code = 503
+    detail = "model unavailable"
+
+
+def test_traced_records_stages_fields_and_results(log_path, monkeypatch):
+    monkeypatch.setattr(request_log, "MAX_LOGGED_IDS", 2)
+
+    @traced("employees_ai_search", result_ids=lambda ids: ids, table="employees")
+    def search(task_description):
+        with stage("model"):
+            record(model="fake", sql="SELECT 1")
+        with stage("model"):
+            pass
+        return [3, 1, 2]
+
+    assert search(task_description="React developer") == [3, 1, 2]
+
+    [entry] = read_log(log_path)
+    assert entry["endpoint"] == "employees_ai_search"
+    assert entry["task"] == "React developer"
+    assert (entry["table"], entry["model"], entry["sql"]) == ("employees", "fake", "SELECT 1")
+    assert (entry["result_ids"], entry["result_count"]) == ([3, 1], 3)
+    assert (entry["status"], entry["error"]) == (200, None)
+    assert list(entry["timings_ms"]) == ["model"]
+    assert entry["total_ms"] >= entry["timings_ms"]["model"]
+
+
+def test_traced_records_failures_and_reraises(log_path):
+    @traced("demands_ai_sql_search", result_ids=lambda rows: rows)
+    def search(task_description):
+        raise Failure()
+
+    with pytest.raises(Failure):
+        search(task_description="SA in Pune")
+
+    [entry] = read_log(log_path)
+    assert (entry["status"], entry["error"]) == (503, "model unavailable")
+    assert "result_ids" not in entry
+
+
+def test_stage_and_record_outside_a_request_do_nothing(log_path):
+    with stage("model"):
+        record(model="fake")
+    assert not os.path.exists(log_path)
+
+
+def test_log_is_off_by_default():
+    env = {k: v for k, v in os.environ.items() if k != "AI_REQUEST_LOG"}
+    out = subprocess.run(
+        [sys.executable, "-c", "import request_log; print(repr(request_log.AI_REQUEST_LOG))"],
+        cwd=os.path.dirname(request_log.__file__), env=env, capture_output=True, text=True, check=True,
+    )
+    assert out.stdout.strip() == "''"
+
+
+def test_logged_request_replays_against_the_fake_model(log_path, tmp_path, monkeypatch):
+    import ai_agent
+    import main
+    from benchmarks.replay import replay
+    from data import mock_employees
+    from employee_store import EmployeeStore
+
+    store = EmployeeStore(str(tmp_path / "snapshots"))
+    store.publish(list(mock_employees), fingerprint="test", source="test")
+    monkeypatch.setattr(main, "employee_store", store)
+    monkeypatch.setattr(ai_agent, "API_KEY", "test")
+
+    found = main.ai_search_employees(task_description="Python developer for a FastAPI backend")
+
+    [entry] = read_log(log_path)
+    assert entry["result_ids"] == [e.id for e in found]
+    report = replay([entry], store.snapshot().employees(), cache_size=8)
+    assert report["records"] == {"replayed": 1, "skipped": 0}
+    assert report["agreement"]["model"] == {"overlap_at_k": 1.0, "jaccard": 1.0}
+    assert set(report["agreement"]) == {"model", "keyword", "taxonomy"}
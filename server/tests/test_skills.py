@@ -0,0 +1,64 @@
+import threading
+
+from skills import ROLES, SKILL_TAXONOMY, SKILLS, Taxonomy
+
+
+def test_mentioned_ignores_ordinary_words():
+    assert SKILLS.mentioned("go live with new data models") == set()
+    assert SKILLS.mentioned("Go live with new data models") == set()
+    assert SKILLS.mentioned("strong people skills") == set()
+    assert SKILLS.mentioned("express interest in the project") == set()
+    assert SKILLS.mentioned("We ship in the spring. Java developers wanted") == {"Java"}
+
+
+def test_mentioned_reads_common_words_from_context():
+    assert SKILLS.mentioned("Need a Node developer") == {"Node.js"}
+    assert SKILLS.mentioned("Go microservices") == {"Go"}
+    assert SKILLS.mentioned("experience with node and react") == {"Node.js", "React"}
+    assert SKILLS.mentioned("Backend in Express") == {"Express"}
+
+
+def test_mentioned_allows_one_typo_in_long_words_only():
+    assert SKILLS.mentioned("postgress and kubernets") == {"PostgreSQL", "Kubernetes"}
+    # Two edits away, or too short for typos in running text
+    assert SKILLS.mentioned("kubrnets") == set()
+    assert SKILLS.mentioned("pythn") == set()
+
+
+def test_roles_resolve_one_typo_only():
+    assert ROLES.resolve("QA Enginer") == {"QA Engineer"}
+    assert ROLES.resolve("Sr AE") == {"Sr. Application Engineer"}
+    # Left to the substring fallback instead of picking unrelated roles
+    assert ROLES.resolve("Engineer") == set()
+    assert ROLES.resolve("QA Lead") == set()
+
+
+def test_mentioned_still_finds_skills_and_long_typos():
+    text = "Golang and Node.js services on k8s with Express.js, Spring Boot and kubernets, postgress"
+    assert SKILLS.mentioned(text) == {"Go", "Node.js", "Kubernetes", "Express", "Spring Boot", "PostgreSQL"}
+    # Search terms are not free text: aliases and typos still resolve
+    assert SKILLS.resolve("go") == {"Go"}
+    assert SKILLS.resolve("kubernets") == {"Kubernetes"}
+
+
+def test_resolve_while_adding():
+    taxonomy = Taxonomy(SKILL_TAXONOMY)
+    errors = []
+
+    def add():
+        for i in range(300):
+            taxonomy.add(f"Skill {i:04d}")
+
+    def resolve():
+        try:
+            for i in range(300):
+                taxonomy.resolve(f"skil {i:04d}x")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=add), threading.Thread(target=resolve)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
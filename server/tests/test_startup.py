@@ -0,0 +1,27 @@
+import sys
+import threading
+import time
+
+from startup import lazy_import, startup_report
+
+
+def test_lazy_import_waits_for_a_module_still_being_imported(tmp_path, monkeypatch):
+    (tmp_path / "slow_import_module.py").write_text("import time\ntime.sleep(0.3)\nVALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "slow_import_module", raising=False)
+
+    seen = []
+
+    def load():
+        seen.append(hasattr(lazy_import("slow_import_module"), "VALUE"))
+
+    first = threading.Thread(target=load)
+    first.start()
+    time.sleep(0.1)
+    second = threading.Thread(target=load)
+    second.start()
+    first.join()
+    second.join()
+
+    assert seen == [True, True]
+    assert startup_report()["lazy_imports"]["slow_import_module"] >= 250
@@ -0,0 +1,147 @@
+from datetime import datetime
+
+import pytest
+
+from sync import SyncSchemaError, changes_since, ensure_sync_schema, forget_schema, sync_ready
+
+
+def legacy_demands(connect, values):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("DROP TABLE IF EXISTS demands")
+    cur.execute("CREATE TABLE demands (id TEXT PRIMARY KEY, updatedon TEXT)")
+    cur.executemany("INSERT INTO demands VALUES (%s, %s)", [(str(i), v) for i, v in enumerate(values)])
+    conn.commit()
+    forget_schema("demands")
+    return conn
+
+
+def updatedon(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT updatedon FROM demands ORDER BY id")
+    return [r[0] for r in cur.fetchall()]
+
+
+def test_legacy_updatedon_is_converted_month_first_only_on_request(pg):
+    conn = legacy_demands(pg, ["03-01-2025 00:00", "1/15/2025 9:05", "2025-02-03 10:00:00", None])
+
+    with pytest.raises(SyncSchemaError):
+        sync_ready(conn, "demands")
+    with pytest.raises(SyncSchemaError):
+        ensure_sync_schema(conn, "demands")
+    assert updatedon(conn)[0] == "03-01-2025 00:00"
+
+    assert ensure_sync_schema(conn, "demands", convert=True)
+    assert updatedon(conn) == [
+        datetime(2025, 3, 1), datetime(2025, 1, 15, 9, 5), datetime(2025, 2, 3, 10), None,
+    ]
+    assert sync_ready(conn, "demands")
+    conn.close()
+
+
+def test_legacy_updatedon_is_read_day_first_when_it_cant_be_month_first(pg):
+    conn = legacy_demands(pg, ["25-03-2025 08:00", "01-04-2025 00:00"])
+
+    ensure_sync_schema(conn, "demands", convert=True)
+
+    assert updatedon(conn) == [datetime(2025, 3, 25, 8), datetime(2025, 4, 1)]
+    conn.close()
+
+
+def test_conversion_refuses_values_it_cannot_parse(pg):
+    conn = legacy_demands(pg, ["03-01-2025 00:00", "last tuesday"])
+
+    with pytest.raises(SyncSchemaError, match="1 demands.updatedon values"):
+        ensure_sync_schema(conn, "demands", convert=True)
+
+    assert updatedon(conn) == ["03-01-2025 00:00", "last tuesday"]
+    conn.close()
+
+
+def test_upload_into_legacy_demands_keeps_uploaded_updatedon(pg):
+    from ingest import infer_types, load_frame, normalize_upload_frame, read_frame
+
+    conn = legacy_demands(pg, ["06-03-2025 00:00"])
+    conn.cursor().execute("ALTER TABLE demands ADD COLUMN role TEXT, ADD COLUMN status TEXT")
+    conn.commit()
+    raw = normalize_upload_frame(read_frame("demands.csv", (
+        b"id,role,status,updatedOn\n"
+        b"0,AE,Open,07-01-2025 09:30\n"
+        b"9,SA,Open,07-02-2025 10:00\n"
+    )))
+    typed, column_types = infer_types(raw)
+
+    result = load_frame("demands", raw, typed, column_types)
+
+    assert "--convert-updatedon" in result["sync_schema_error"]
+    assert (result["inserted"], result["updated"]) == (1, 1)
+    assert updatedon(conn) == ["07-01-2025 09:30", "07-02-2025 10:00"]
+    with pytest.raises(SyncSchemaError, match="--convert-updatedon"):
+        sync_ready(conn, "demands")
+    conn.close()
+
+
+def tracked_table(connect, table):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {table}")
+    cur.execute(f"CREATE TABLE {table} (id TEXT PRIMARY KEY, name TEXT)")
+    conn.commit()
+    forget_schema(table)
+    assert ensure_sync_schema(conn, table)
+    cur.executemany(f"INSERT INTO {table} (id, name) VALUES (%s, %s)", [("a", "A"), ("b", "B"), ("c", "C")])
+    conn.commit()
+    return conn
+
+
+def changed_ids(delta):
+    return sorted(row["id"] for row in delta["changed"])
+
+
+@pytest.mark.parametrize("table", ["demands", "employees"])
+def test_delta_returns_updated_rows_and_tombstones(pg, table):
+    writer = tracked_table(pg, table)
+    reader = pg()
+
+    full = changes_since(reader, table, None)
+    assert (full["full"], changed_ids(full), full["deleted"]) == (True, ["a", "b", "c"], [])
+
+    cur = writer.cursor()
+    cur.execute(f"UPDATE {table} SET name = 'B2' WHERE id = 'b'")
+    writer.commit()
+    delta = changes_since(reader, table, full["watermark"])
+    assert (delta["full"], changed_ids(delta), delta["deleted"]) == (False, ["b"], [])
+    assert delta["changed"][0]["name"] == "B2"
+
+    cur.execute(f"DELETE FROM {table} WHERE id = 'c'")
+    writer.commit()
+    delta = changes_since(reader, table, delta["watermark"])
+    assert (changed_ids(delta), delta["deleted"]) == ([], ["c"])
+
+    # Nothing new: an empty delta
+    delta = changes_since(reader, table, delta["watermark"])
+    assert (changed_ids(delta), delta["deleted"]) == ([], [])
+    writer.close()
+    reader.close()
+
+
+@pytest.mark.parametrize("table", ["demands", "employees"])
+def test_watermark_waits_for_transactions_still_running(pg, table):
+    writer = tracked_table(pg, table)
+    slow = pg()
+    reader = pg()
+    start = changes_since(reader, table, None)["watermark"]
+
+    # A long upload stamps its row, then commits after a sync has run
+    slow.cursor().execute(f"UPDATE {table} SET name = 'slow' WHERE id = 'a'")
+    writer.cursor().execute(f"UPDATE {table} SET name = 'fast' WHERE id = 'b'")
+    writer.commit()
+    during = changes_since(reader, table, start)
+    # The watermark stays behind the open transaction, so later commits wait too
+    assert changed_ids(during) == []
+    slow.commit()
+
+    after = changes_since(reader, table, during["watermark"])
+    assert {row["id"]: row["name"] for row in after["changed"]} == {"a": "slow", "b": "fast"}
+    for conn in (writer, slow, reader):
+        conn.close()